@@ -3,58 +3,257 @@ Medical LangChain Agent for Revival Hospital System
 Deterministic, tool-first answers. No tool names/IDs/URLs in replies.
 """
 
+import asyncio
 import logging
 import importlib
+import inspect
 import pkgutil
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import functools
+import hashlib
+from dataclasses import dataclass
+from collections import deque, OrderedDict
+from itertools import islice
+from typing import List, Dict, Any, Optional, Deque, ClassVar, Tuple, AsyncIterator, Iterator
+from datetime import datetime, date, timedelta
 import os
 import re
+import time
+from string import Template
+
+from .response_filter import strip_leaks
 
 try:
-    from langchain.agents import create_openai_tools_agent, AgentExecutor
-    from langchain_community.chat_models import ChatOllama
-    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-    from langchain.schema import HumanMessage, AIMessage
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
-    LANGCHAIN_AVAILABLE = False
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
 
 logger = logging.getLogger(__name__)
 
+# LangChain is imported on the first agent build, not at module import, so the
+# API process starts (and reloads) without paying for the dependency tree.
+LANGCHAIN_AVAILABLE = False
+OLLAMA_NATIVE_CLIENT = False
+_ROLE_TO_MSG: Dict[str, Any] = {}
+
+# Cross-patient tools are withheld from the patient role (role_id 1); everything
+# else is shared, so both roles bind the same tool instances.
+PATIENT_ROLE_ID = 1
+_STAFF_ONLY_TOOLS = frozenset({"analyze_multiple_patients", "list_known_patients"})
+
+
+@functools.cache
+def _lazy_import_langchain() -> bool:
+    global create_openai_tools_agent, AgentExecutor, ChatPromptTemplate, MessagesPlaceholder
+    global HumanMessage, AIMessage, SystemMessage, ChatOllama, httpx
+    global LANGCHAIN_AVAILABLE, OLLAMA_NATIVE_CLIENT
+    try:
+        from langchain.agents import create_openai_tools_agent, AgentExecutor
+        from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+        from langchain.schema import HumanMessage, AIMessage, SystemMessage
+    except ImportError as e:
+        logger.warning(f"LangChain not available: {e}")
+        return False
+    try:
+        # Keeps one pooled httpx.AsyncClient per instance (the community client
+        # opens a fresh aiohttp session for every call)
+        from langchain_ollama import ChatOllama
+        import httpx
+        OLLAMA_NATIVE_CLIENT = True
+    except ImportError:
+        try:
+            from langchain_community.chat_models import ChatOllama
+        except ImportError as e:
+            logger.warning(f"ChatOllama not available: {e}")
+            return False
+    _ROLE_TO_MSG.update({"user": HumanMessage, "assistant": AIMessage})
+    LANGCHAIN_AVAILABLE = True
+    return True
+
+# Short memory window for determinism; token budget leaves room for the
+# system prompt and tool schemas inside llama3's 8k context.
+MAX_HISTORY_MESSAGES = 20
+MAX_HISTORY_TOKENS = 4000
+# Step tracing is for local debugging only (MEDAGENT_VERBOSE=1)
+AGENT_VERBOSE = os.getenv("MEDAGENT_VERBOSE", "0") == "1"
+# Ollama settings are read once at import, not on every session build
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_SEED = int(os.getenv("OLLAMA_SEED", "42"))
+OLLAMA_SUMMARY_MODEL = os.getenv("OLLAMA_SUMMARY_MODEL")
+# The opening exchange stays pinned at the head of the history (byte-identical
+# every turn, so it stays in the prefix cache); later messages that roll off
+# the window are folded into one cumulative summary placed after it.
+PINNED_MESSAGES = 2
+MAX_PINNED_TOKENS = 300
+MAX_SUMMARY_TOKENS = 200
+# Rolled-off messages are summarized in batches, in the background, so a turn
+# never waits on the summary model; the backlog is capped if summaries keep failing
+SUMMARY_BATCH_MESSAGES = int(os.getenv("SUMMARY_BATCH_MESSAGES", "8"))
+MAX_ROLLED_OFF = 4 * SUMMARY_BATCH_MESSAGES
+SUMMARY_INSTRUCTION = (
+    "Summarize these exchanges in at most 200 tokens, merging them into the existing summary. "
+    "Preserve patient names, patient IDs, dates, readings and clinical findings. "
+    "Output only the summary."
+)
+# Repeat questions (same user, same wording, same day) are answered from memory.
+# Time-relative questions expire quickly; absolute ones can live longer.
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_TTL_RELATIVE = 60
+RESPONSE_TTL_ABSOLUTE = 600
+_RELATIVE_TIME = re.compile(r"\b(today|now|current|currently|latest|recent|last|yesterday|this (week|month))\b", re.I)
+_response_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, str]]" = OrderedDict()
+# Near-duplicate queries share a cache key: punctuation (except decimal points)
+# and politeness fillers are dropped before hashing; the words that carry
+# meaning, numbers and dates included, must still match exactly.
+_CACHE_PUNCT = re.compile(r"[^\w\s.]+|(?<!\d)\.|\.(?!\d)")
+_CACHE_FILLERS = re.compile(r"\b(?:please|kindly|can you|could you|would you|tell me)\b")
+
+
+def _count_tokens(text: str) -> int:
+    """Token count for a message; falls back to ~4 chars/token without tiktoken."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the trailing max_tokens tokens of text (the most recent content)."""
+    if max_tokens <= 0:
+        return ""
+    if _ENCODING is not None:
+        ids = _ENCODING.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else _ENCODING.decode(ids[-max_tokens:])
+    return text[-max_tokens * 4:]
+
+
+# Very explicit rules to prevent guessing and to force tools. This block is
+# byte-identical on every turn so the model server can reuse its prefix cache;
+# the date travels in a separate, later system message.
+_SYSTEM_PROMPT = Template("""You are a medical assistant AI for Revival Hospital.
+                 
+                 **CRITICAL INSTRUCTION: You must behave as a deterministic system. For the exact same user input, you must use the exact same tools with the exact same parameters and provide the exact same final answer, regardless of the conversation history.**
 
-def _strip_leaks(text: str) -> str:
-    """Make responses concise, remove tool/function mentions, IDs, and links."""
-    if not isinstance(text, str):
-        text = str(text)
-    lines = [
-        ln for ln in text.splitlines()
-        if not re.search(r"^\s*(BOT:|```|Tool:|Observation:|Thought:|Action:|Final Answer:|AgentExecutor)", ln, re.I)
-    ]
-    s = " ".join(ln.strip() for ln in lines if ln.strip())
+ABSOLUTE RULES:
+- Be concise: one short sentence unless the user explicitly asks for a list/table.
+- Don not make up information or use your general knowledge
+- NEVER guess patient data. ALWAYS call appropriate tools for medical data (meals, glucose/vitals, medications, protocols).
+- If a tool returns no data, say "No record found for that request." Do not invent details.
+- Do NOT mention tools, functions, IDs, databases, or access modes.
+- If the question names a patient, include the name naturally (e.g., "Rayudu's ...").
+- No URLs, emojis, or disclaimers—just the answer.$parallel_rule""")
+
+_PARALLEL_TOOLS_RULE = (
+    "\n- When a question needs several independent records (e.g., profile, plan and medications), "
+    "request all of those tool calls together in a single step."
+)
+
+
+@functools.lru_cache(maxsize=2)
+def _static_system_prompt(parallel_tools: bool) -> str:
+    return _SYSTEM_PROMPT.substitute(parallel_rule=_PARALLEL_TOOLS_RULE if parallel_tools else "")
+
+
+@dataclass(slots=True)
+class _Msg:
+    """One conversation turn; tokens and the LangChain message are built once on append."""
+    role: str
+    content: str
+    tokens: int = 0
+    lc: Any = None
 
-    # Remove “according to … tool” or function-y snippets
-    s = re.sub(r"\bget_[a-z_]+\([^)]*\)", "", s, flags=re.I)
-    s = re.sub(r"\bsearch_[a-z_]+\([^)]*\)", "", s, flags=re.I)
-    s = re.sub(r"\bfetch_[a-z_]+\([^)]*\)", "", s, flags=re.I)
-    s = re.sub(r"\baccording to [^,.]*\btool\b[^,]*,?\s*", "", s, flags=re.I)
-    s = re.sub(r"\busing [^,.]*\btool\b[^:]*:\s*", "", s, flags=re.I)
-    s = re.sub(r"\bvia the [^,.]*\btool\b[^,]*,?\s*", "", s, flags=re.I)
-    s = re.sub(r"\b(get_foodlog|get_medications|get_medical_readings|get_specific_medical_value)\b", "", s, flags=re.I)
 
-    # Remove URLs and markdown images
-    s = re.sub(r"!\[[^\]]*\]\((https?://[^\)]+)\)", "", s)
-    s = re.sub(r"https?://\S+", "", s)
-    s = re.sub(r"<[^>]+>", "", s)
+def _make_msg(role: str, content: str, tokens: Optional[int] = None) -> _Msg:
+    if tokens is None:
+        tokens = _count_tokens(content)
+    return _Msg(role, content, tokens, _ROLE_TO_MSG[role](content=content))
 
-    # Trim banners/disclaimers
-    s = re.sub(r"(Please note|This information is based on).*$", "", s, flags=re.I)
-    s = re.sub(r"\s{2,}", " ", s).strip()
 
-    # Keep one concise sentence unless asked for a list/table
-    if s.count(". ") >= 1 and not re.search(r"(list|table|show|all|summary|compare|history|trend)", s, re.I):
-        s = s.split(". ")[0].rstrip(".") + "."
-    return s
+@functools.lru_cache(maxsize=1)
+def _date_context_for(day: date) -> str:
+    """
+    Trailing prompt date block; keyed by the day so it is formatted once and
+    rolls over at midnight. ISO forms match the tools' date_filter parameters.
+    """
+    yesterday = day - timedelta(days=1)
+    return (
+        f"Today is {day.strftime('%B %d, %Y')} ({day.isoformat()}). "
+        f"Yesterday was {yesterday.isoformat()}. This month is {day.strftime('%Y-%m')}."
+    )
+
+
+def _generate_date_context() -> str:
+    return _date_context_for(date.today())
+
+
+_iso_cache: Tuple[int, str] = (0, "")
+
+
+def _iso_now_cached() -> str:
+    """Local ISO timestamp for response metadata, reformatted at most once per second."""
+    global _iso_cache
+    now = int(time.time())
+    if now != _iso_cache[0]:
+        _iso_cache = (now, datetime.fromtimestamp(now).isoformat())
+    return _iso_cache[1]
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Optional[str]:
+    hit = _response_cache.get(key)
+    if hit is None:
+        return None
+    expires, answer = hit
+    if expires < time.monotonic():
+        del _response_cache[key]
+        return None
+    _response_cache.move_to_end(key)
+    return answer
+
+
+def _cache_put(key: Tuple[Any, ...], message: str, answer: str):
+    ttl = RESPONSE_TTL_RELATIVE if _RELATIVE_TIME.search(message) else RESPONSE_TTL_ABSOLUTE
+    _response_cache[key] = (time.monotonic() + ttl, answer)
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+@functools.cache
+def _discover_tool_classes() -> Tuple[type, ...]:
+    """Scan the tools package once per process; sessions only instantiate the result."""
+    classes: List[type] = []
+    try:
+        from langchain.tools import BaseTool
+        import tools as tools_pkg
+    except Exception as e:
+        logger.error(f"❌ Tools package not importable: {e}")
+        return ()
+
+    # Prefer these first so the agent sees them
+    preferred = [
+        "foodlog_tool",
+        "specific_medical_value_tool",
+        "medical_readings_tool",
+        "medications_tool",
+        "protocols_tool",
+        "doctor_patient_info_tool",
+        "basic_medical_analysis_tool",
+    ]
+    discovered = [m.name for m in pkgutil.iter_modules(tools_pkg.__path__) if m.name != "__init__"]
+    ordered = preferred + [n for n in discovered if n not in preferred]
+
+    seen: set = set()
+    for mod_name in ordered:
+        try:
+            module = importlib.import_module(f"tools.{mod_name}")
+        except Exception as e:
+            logger.warning(f"Skipping tool '{mod_name}': {e}")
+            continue
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            # A tool class re-imported by another module is only registered once
+            if issubclass(cls, BaseTool) and cls is not BaseTool and cls not in seen:
+                seen.add(cls)
+                classes.append(cls)
+    return tuple(classes)
 
 
 class MedicalLangChainAgent:
@@ -62,157 +261,390 @@ class MedicalLangChainAgent:
     Deterministic agent wrapper with strict tool usage for data queries.
     """
 
-    def __init__(self, user_context: Optional[Dict[str, Any]] = None, **kwargs):
+    # One ChatOllama client per (model, temperature, seed), shared by every session
+    _llm_cache: ClassVar[Dict[Tuple[str, float, int], Any]] = {}
+    # The compiled prompt holds no user data, so it is built once per parallel-call setting
+    _prompt_cache: ClassVar[Dict[bool, Any]] = {}
+
+    def __init__(self, user_context: Optional[Dict[str, Any]] = None,
+                 enable_parallel_tool_execution: bool = True,
+                 max_messages: int = MAX_HISTORY_MESSAGES, **kwargs):
         self.user_context = user_context or {}
-        self.conversation_history: List[Dict[str, str]] = []
+        # AgentExecutor.ainvoke already gathers every tool call emitted in one step;
+        # this flag asks the model to emit independent lookups together.
+        self.enable_parallel_tool_execution = enable_parallel_tool_execution
+        # Bounded window: the oldest message falls off in O(1) on append
+        self.conversation_history: Deque[_Msg] = deque(maxlen=max_messages)
+        # Running token total of conversation_history, kept in step with the deque
+        self._history_tokens = 0
+        # Older turns survive as a short summary instead of being forgotten
+        self._summary: str = ""
+        self._summary_tokens: int = 0
+        self._rolled_off: List[_Msg] = []
+        self._summary_task: Optional[asyncio.Task] = None
+        self._pinned: List[_Msg] = []
+        # How many pinned messages have left the deque and must be re-sent up front
+        self._pinned_evicted = 0
+        self._llm: Any = None
+        # History summaries are a plain compression task; OLLAMA_SUMMARY_MODEL can
+        # point them at a smaller model while the main model keeps tool calling
+        self._summary_llm: Any = None
         self.agent_executor: Any = None
+        # One executor per role group, bound lazily over the shared tool instances
+        self._executors: Dict[bool, Any] = {}
         self.tools: List[Any] = []
         self._init_complete = False
 
-    # Back-compat for your chat_routes.py
-    def set_user_context(self, ctx: Dict[str, Any]):
-        self.user_context = ctx or {}
-
-    async def initialize(self):
-        if self._init_complete or not LANGCHAIN_AVAILABLE:
+    def _append_history(self, role: str, content: str):
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            # The deque is about to drop its oldest message; pinned ones stay pinned,
+            # the rest are kept for the summary
+            oldest = self.conversation_history[0]
+            self._history_tokens -= oldest.tokens
+            if self._pinned_evicted < len(self._pinned):
+                self._pinned_evicted += 1
+            else:
+                self._rolled_off.append(oldest)
+        # Token count is measured once here so truncation only sums cached ints
+        msg = _make_msg(role, content)
+        self.conversation_history.append(msg)
+        self._history_tokens += msg.tokens
+        if len(self._pinned) < PINNED_MESSAGES:
+            if msg.tokens > MAX_PINNED_TOKENS:
+                msg = _make_msg(role, _truncate_to_tokens(content, MAX_PINNED_TOKENS), MAX_PINNED_TOKENS)
+            self._pinned.append(msg)
+
+    def _discard_user_turn(self, pinned_mark: int):
+        """Undo the user message of a turn that never got an answer (client gone, timeout)."""
+        if self.conversation_history and self.conversation_history[-1].role == "user":
+            self._history_tokens -= self.conversation_history.pop().tokens
+        del self._pinned[pinned_mark:]
+
+    def _iter_window(self, max_tokens: int, max_messages: int) -> Iterator[_Msg]:
+        """Yield, oldest first, the tail of the history that fits both budgets."""
+        history = self.conversation_history
+        if len(history) <= max_messages and self._history_tokens <= max_tokens:
+            # Under both budgets: nothing to trim
+            yield from history
+            return
+        skip = max(0, len(history) - max_messages)
+        total = self._history_tokens
+        if skip:
+            total -= sum(m.tokens for m in islice(history, skip))
+        # Drop from the oldest end using the running total: O(messages dropped)
+        boundary: Optional[_Msg] = None
+        rest = islice(history, skip, None)
+        for msg in rest:
+            if total <= max_tokens:
+                break
+            total -= msg.tokens
+            boundary = msg
+        else:
+            msg = None
+        remaining = max_tokens - total
+        if boundary is not None and remaining > 0:
+            # Keep the tail of the boundary message rather than dropping it outright
+            yield _make_msg(boundary.role, _truncate_to_tokens(boundary.content, remaining), remaining)
+        if msg is not None:
+            yield msg
+            yield from rest
+
+    def truncate_conversation_history(self, max_tokens: int = MAX_HISTORY_TOKENS,
+                                      max_messages: int = MAX_HISTORY_MESSAGES) -> List[_Msg]:
+        """Window of the history that fits both the message and token budgets."""
+        return list(self._iter_window(max_tokens, max_messages))
+
+    def truncate_and_convert(self, max_tokens: int = MAX_HISTORY_TOKENS,
+                             max_messages: int = MAX_HISTORY_MESSAGES) -> List[Any]:
+        """Same window as truncate_conversation_history, as LangChain messages in one pass."""
+        return [m.lc for m in self._iter_window(max_tokens, max_messages)]
+
+    def _schedule_summary(self):
+        """Start a background summary once a full batch of messages has rolled off."""
+        if self._summary_llm is None:
+            self._rolled_off.clear()
+            return
+        if len(self._rolled_off) < SUMMARY_BATCH_MESSAGES:
             return
+        if self._summary_task is None or self._summary_task.done():
+            self._summary_task = asyncio.create_task(self._summarize_rolled_off())
+
+    async def _summarize_rolled_off(self):
+        """Fold messages that left the window into the running summary (one LLM call)."""
+        batch = list(self._rolled_off)
+        exchanges = "\n".join(f"{m.role}: {m.content}" for m in batch)
         try:
-            # Deterministic LLM: lock temperature, top_p and seed (via model_kwargs)
-            seed = int(os.getenv("OLLAMA_SEED", "42"))
-            llm = ChatOllama(
-                model=os.getenv("OLLAMA_MODEL", "llama3"),
-                temperature=0.0,
-                top_p=1.0,
-                model_kwargs={"seed": seed},
-            )
+            reply = await self._summary_llm.ainvoke([
+                SystemMessage(content=SUMMARY_INSTRUCTION),
+                HumanMessage(content=f"Existing summary:\n{self._summary or '(none)'}\n\nExchanges:\n{exchanges}"),
+            ])
+            summary = _truncate_to_tokens((getattr(reply, "content", "") or "").strip(), MAX_SUMMARY_TOKENS)
+            if summary:
+                self._summary = summary
+                self._summary_tokens = _count_tokens(summary)
+                # Only now are these folded in; messages that rolled off meanwhile stay queued
+                del self._rolled_off[:len(batch)]
+        except Exception as e:
+            logger.warning(f"History summarization failed, keeping previous summary: {e}")
+        # Unsummarized messages are retried with the next batch, up to MAX_ROLLED_OFF
+        del self._rolled_off[:-MAX_ROLLED_OFF]
 
-            self.tools = self._create_tools()
-            for t in self.tools:
-                try:
+    # Back-compat for your chat_routes.py
+    def set_user_context(self, ctx: Dict[str, Any]):
+        ctx = ctx or {}
+        if ctx == self.user_context:
+            # Same user re-querying: tools already hold this context
+            return
+        # The prompt is user-independent, so only the existing tools need the new context
+        self.user_context = ctx
+        self._propagate_user_context()
+        # Access scope may have changed: forget this user's cached answers
+        user_id = ctx.get("user_id")
+        for key in [k for k in _response_cache if k[0] == user_id]:
+            del _response_cache[key]
+
+    def _response_cache_key(self, message: str) -> Tuple[Any, ...]:
+        normalized = _CACHE_FILLERS.sub(" ", _CACHE_PUNCT.sub(" ", message.casefold()))
+        normalized = " ".join(normalized.split())
+        # Follow-ups ("and yesterday?") only mean something relative to the
+        # previous answer, so the preceding assistant turn is part of the key
+        last_reply = next((m.content for m in reversed(self.conversation_history) if m.role == "assistant"), "")
+        return (
+            self.user_context.get("user_id"),
+            self.user_context.get("role_id"),
+            hashlib.sha1(normalized.encode("utf-8")).hexdigest(),
+            hashlib.sha1(last_reply.encode("utf-8")).hexdigest() if last_reply else None,
+            date.today().isoformat(),
+        )
+
+    def _propagate_user_context(self):
+        for t in self.tools:
+            try:
+                if hasattr(t, "set_user_context"):
+                    t.set_user_context(self.user_context)
+                else:
                     setattr(t, "user_context", self.user_context)
-                except Exception:
-                    pass
-
-            current_date_context = f"Today is {datetime.now().strftime('%B %d, %Y')}."
-
-            # Very explicit rules to prevent guessing and to force tools
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", f"""You are a medical assistant AI for Revival Hospital.
-                 
-                 **CRITICAL INSTRUCTION: You must behave as a deterministic system. For the exact same user input, you must use the exact same tools with the exact same parameters and provide the exact same final answer, regardless of the conversation history.**
-
-ABSOLUTE RULES:
-- Be concise: one short sentence unless the user explicitly asks for a list/table.
-- Don not make up information or use your general knowledge
-- NEVER guess patient data. ALWAYS call appropriate tools for medical data (meals, glucose/vitals, medications, protocols).
-- If a tool returns no data, say "No record found for that request." Do not invent details.
-- Do NOT mention tools, functions, IDs, databases, or access modes.
-- If the question names a patient, include the name naturally (e.g., "Rayudu's ...").
-- For meal-on-date questions (e.g., "Rayudu's breakfast on 13 March 2025"), call the food log tool and answer with its result only.
-- No URLs, emojis, or disclaimers—just the answer.
-                 
-
-{current_date_context}"""),
+            except Exception:
+                pass
+
+    def _build_llm(self, model: Optional[str] = None) -> Any:
+        # Deterministic LLM: lock temperature, top_p and seed (via model_kwargs)
+        model = model or OLLAMA_MODEL
+        seed = OLLAMA_SEED
+        key = (model, 0.0, seed)
+        llm = self._llm_cache.get(key)
+        if llm is None:
+            if OLLAMA_NATIVE_CLIENT:
+                llm = ChatOllama(
+                    model=model,
+                    temperature=0.0,
+                    top_p=1.0,
+                    seed=seed,
+                    client_kwargs={
+                        "timeout": 120,
+                        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                    },
+                )
+            else:
+                llm = ChatOllama(
+                    model=model,
+                    temperature=0.0,
+                    top_p=1.0,
+                    model_kwargs={"seed": seed},
+                )
+            self._llm_cache[key] = llm
+        return llm
+
+    def _build_prompt(self) -> Any:
+        key = self.enable_parallel_tool_execution
+        prompt = self._prompt_cache.get(key)
+        if prompt is None:
+            prompt = self._prompt_cache[key] = ChatPromptTemplate.from_messages([
+                ("system", _static_system_prompt(key)),
+                ("system", "{date_context}"),
                 MessagesPlaceholder("chat_history"),
                 ("human", "{input}"),
                 MessagesPlaceholder("agent_scratchpad"),
             ])
+        return prompt
 
-            agent = create_openai_tools_agent(llm, self.tools, prompt)
-            self.agent_executor = AgentExecutor(
-                agent=agent,
-                tools=self.tools,
-                verbose=False,
-                max_iterations=5,
-                handle_parsing_errors=True,
-                return_intermediate_steps=False,
-            )
+    async def initialize(self):
+        if self._init_complete or not _lazy_import_langchain():
+            return
+        try:
+            self._llm = self._build_llm()
+            self._summary_llm = self._build_llm(OLLAMA_SUMMARY_MODEL)
+            self.tools = self._create_tools()
+            self._propagate_user_context()
             self._init_complete = True
         except Exception as e:
             logger.error(f"Failed to initialize agent: {e}")
             self._init_complete = False
 
+    def _current_executor(self) -> Any:
+        """Executor for the current user's role group, built on first use."""
+        if not self._init_complete:
+            return None
+        is_patient = self.user_context.get("role_id") == PATIENT_ROLE_ID
+        executor = self._executors.get(is_patient)
+        if executor is None:
+            tools = [t for t in self.tools if not (is_patient and getattr(t, "name", "") in _STAFF_ONLY_TOOLS)]
+            agent = create_openai_tools_agent(self._llm, tools, self._build_prompt())
+            executor = self._executors[is_patient] = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                verbose=AGENT_VERBOSE,
+                callbacks=[],
+                max_iterations=5,
+                # The native client gets tool calls back as structured JSON from
+                # Ollama, so a parse-error retry round-trip is only worth paying
+                # for on the text-based community fallback.
+                handle_parsing_errors=not OLLAMA_NATIVE_CLIENT,
+                return_intermediate_steps=False,
+            )
+        self.agent_executor = executor
+        return executor
+
     def _create_tools(self) -> List[Any]:
+        """Fresh tool instances for this session, from the process-wide class list."""
         tools: List[Any] = []
         if not LANGCHAIN_AVAILABLE:
             return tools
-        try:
-            import tools as tools_pkg
-        except Exception as e:
-            logger.error(f"❌ Tools package not importable: {e}")
-            return tools
-
-        # Prefer these first so the agent sees them
-        preferred = [
-            "foodlog_tool",
-            "specific_medical_value_tool",
-            "medical_readings_tool",
-            "medications_tool",
-            "protocols_tool",
-            "doctor_patient_info_tool",
-            "basic_medical_analysis_tool",
-        ]
-        discovered = [m.name for m in pkgutil.iter_modules(tools_pkg.__path__) if m.name != "__init__"]
-        ordered = preferred + [n for n in discovered if n not in preferred]
-
-        for mod_name in ordered:
+        for cls in _discover_tool_classes():
             try:
-                module = importlib.import_module(f"tools.{mod_name}")
+                tools.append(cls())
             except Exception as e:
-                logger.warning(f"Skipping tool '{mod_name}': {e}")
-                continue
-            for attr in dir(module):
-                obj = getattr(module, attr)
-                try:
-                    from langchain.tools import BaseTool as _BT
-                    if isinstance(obj, type) and issubclass(obj, _BT) and obj is not _BT:
-                        try:
-                            tools.append(obj())
-                        except Exception as e:
-                            logger.warning(f"Could not instantiate {attr} from {mod_name}: {e}")
-                except Exception:
-                    continue
+                logger.warning(f"Could not instantiate {cls.__name__} from {cls.__module__}: {e}")
 
         logger.info(f"Loaded {len(tools)} tool(s): {[getattr(t, 'name', '?') for t in tools]}")
         return tools
 
+    async def _prepare_turn(self, message: str) -> Dict[str, Any]:
+        """Record the user message and build the executor input for this turn."""
+        # Keep a short memory window for determinism
+        self._append_history("user", message)
+        self._schedule_summary()
+        pinned = self._pinned[:self._pinned_evicted]
+        reserved = self._summary_tokens + sum(m.tokens for m in pinned)
+        # Stable head first (pinned opening, then summary), recent window last
+        chat_history: List[Any] = [m.lc for m in pinned]
+        if self._summary:
+            chat_history.append(SystemMessage(content=f"Summary of earlier conversation: {self._summary}"))
+        chat_history.extend(self.truncate_and_convert(max_tokens=MAX_HISTORY_TOKENS - reserved))
+        return {
+            "input": message,
+            "chat_history": chat_history,
+            "date_context": _generate_date_context(),
+        }
+
+    def _finish_turn(self, raw: Any) -> Dict[str, Any]:
+        # Final cleanup: concise + no leaks
+        out = strip_leaks(raw or "")
+        if not out:
+            out = "No record found for that request."
+        self._append_history("assistant", out)
+        return {
+            "message": out,
+            "metadata": {
+                "agent": "Revival365AI",
+                "timestamp": _iso_now_cached(),
+            },
+        }
+
     async def chat(self, message: str) -> Dict[str, Any]:
+        pinned_mark = None
         try:
-            if not (self.agent_executor and LANGCHAIN_AVAILABLE):
+            executor = self._current_executor()
+            if not (executor and LANGCHAIN_AVAILABLE):
                 return {"message": "Medical agent not available.", "metadata": {"error": True}}
 
-            # Keep a short memory window for determinism
-            self.conversation_history.append({"role": "user", "content": message})
-            chat_history: List[Any] = []
-            for msg in self.conversation_history[-20:]:
-                chat_history.append(HumanMessage(content=msg["content"]) if msg["role"] == "user"
-                                  else AIMessage(content=msg["content"]))
-
-            result = await self.agent_executor.ainvoke({"input": message, "chat_history": chat_history})
-            out = result.get("output") or ""
-
-            # Final cleanup: concise + no leaks
-            out = _strip_leaks(out)
-            if not out:
-                out = "No record found for that request."
-            self.conversation_history.append({"role": "assistant", "content": out})
-
-            return {
-                "message": out,
-                "metadata": {
-                    "agent": "Revival365AI",
-                    "timestamp": datetime.now().isoformat(),
-                },
-            }
+            key = self._response_cache_key(message)
+            cached = _cache_get(key)
+            if cached is not None:
+                self._append_history("user", message)
+                response = self._finish_turn(cached)
+                response["metadata"]["cache"] = "hit"
+                return response
+
+            # As in chat_stream: a timed-out (cancelled) turn must not leave its question behind
+            pinned_mark = len(self._pinned)
+            result = await executor.ainvoke(await self._prepare_turn(message))
+            pinned_mark = None
+            response = self._finish_turn(result.get("output"))
+            _cache_put(key, message, response["message"])
+            return response
+        except asyncio.CancelledError:
+            if pinned_mark is not None:
+                self._discard_user_turn(pinned_mark)
+            raise
         except Exception as e:
             logger.error(f"Agent chat failed: {e}")
             return {"message": f"An error occurred: {e}", "metadata": {"error": True}}
 
+    async def chat_stream(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat(): yields {"type": "token"} deltas as the model
+        writes its answer, then one {"type": "final"} event shaped like chat()'s result.
+        Tool-call rounds carry no text content, so only answer tokens are forwarded.
+        """
+        pinned_mark = None
+        try:
+            executor = self._current_executor()
+            if not (executor and LANGCHAIN_AVAILABLE):
+                yield {"type": "final", "message": "Medical agent not available.", "metadata": {"error": True}}
+                return
+
+            key = self._response_cache_key(message)
+            cached = _cache_get(key)
+            if cached is not None:
+                self._append_history("user", message)
+                response = self._finish_turn(cached)
+                response["metadata"]["cache"] = "hit"
+                yield {"type": "final", **response}
+                return
+
+            # Set while the user turn is recorded but unanswered, so a cancelled
+            # stream does not leave a dangling question in the history
+            pinned_mark = len(self._pinned)
+            inputs = await self._prepare_turn(message)
+            root_run_id = None
+            output = None
+            async for ev in executor.astream_events(inputs, version="v2"):
+                kind = ev["event"]
+                if root_run_id is None:
+                    root_run_id = ev.get("run_id")
+                if kind == "on_chat_model_stream":
+                    text = getattr(ev["data"].get("chunk"), "content", "")
+                    if text:
+                        yield {"type": "token", "content": text}
+                elif kind == "on_chain_end" and ev.get("run_id") == root_run_id:
+                    output = (ev["data"].get("output") or {}).get("output")
+            pinned_mark = None
+            response = self._finish_turn(output)
+            _cache_put(key, message, response["message"])
+            yield {"type": "final", **response}
+        except (asyncio.CancelledError, GeneratorExit):
+            if pinned_mark is not None:
+                self._discard_user_turn(pinned_mark)
+            raise
+        except Exception as e:
+            logger.error(f"Agent chat stream failed: {e}")
+            yield {"type": "final", "message": f"An error occurred: {e}", "metadata": {"error": True}}
+
     def get_conversation_history(self) -> List[Dict[str, Any]]:
-        return list(self.conversation_history)
+        return [{"role": m.role, "content": m.content, "tokens": m.tokens} for m in self.conversation_history]
 
     def clear_history(self):
         self.conversation_history.clear()
+        self._history_tokens = 0
+        self._summary = ""
+        self._summary_tokens = 0
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+            self._summary_task = None
+        self._rolled_off.clear()
+        self._pinned.clear()
+        self._pinned_evicted = 0
 
 
 # Back-compat alias (your router imports from agents import MedicalLangChainAgent)
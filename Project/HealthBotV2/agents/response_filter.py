@@ -0,0 +1,76 @@
+"""
+Response filter for the medical agent
+Strips agent scaffolding, tool names, links and disclaimers from replies.
+
+Pure Python with no third-party imports, so this module can be compiled
+on its own (e.g. `mypyc agents/response_filter.py`) without touching the agent.
+"""
+
+import re
+
+# Compiled once at import; strip_leaks runs on every reply
+_LEAK_PREFIXES = ("bot:", "```", "tool:", "observation:", "thought:", "action:", "final answer:", "agentexecutor")
+_RE_TOOL_CALLS = re.compile(
+    r"\b(?:get|search|fetch)_[a-z_]+\([^)]*\)"
+    r"|\b(?:get_foodlog|get_medications|get_medical_readings|get_specific_medical_value)\b",
+    re.I,
+)
+_RE_TOOL_PHRASES = re.compile(
+    r"\baccording to [^,.]*\btool\b[^,]*,?\s*"
+    r"|\busing [^,.]*\btool\b[^:]*:\s*"
+    r"|\bvia the [^,.]*\btool\b[^,]*,?\s*",
+    re.I,
+)
+_RE_URLS_TAGS = re.compile(r"!\[[^\]]*\]\(https?://[^\)]+\)|https?://\S+|<[^>]+>")
+_RE_DISCLAIMER = re.compile(r"(Please note|This information is based on).*$", re.I)
+_RE_LIST_KEYWORDS = re.compile(r"(list|table|show|all|summary|compare|history|trend)", re.I)
+
+# Short replies with none of these cannot match any pattern above (a trailing
+# period is allowed), so they only need their whitespace collapsed
+_FAST_PATH_MAX = 40
+_FAST_REJECT_CHARS = frozenset("<>(:`!_.")
+_FAST_REJECT_WORDS = ("tool", "please note", "this information is based on", "agentexecutor")
+
+
+def strip_leaks(text: str) -> str:
+    """Make responses concise, remove tool/function mentions, IDs, and links."""
+    if not isinstance(text, str):
+        text = str(text)
+    if len(text) < _FAST_PATH_MAX:
+        body = text.rstrip().rstrip(".")
+        low = body.lower()
+        if not _FAST_REJECT_CHARS.intersection(body) and not any(w in low for w in _FAST_REJECT_WORDS):
+            return " ".join(text.split())
+    lines = [ln for ln in text.splitlines() if not ln.lstrip()[:20].lower().startswith(_LEAK_PREFIXES)]
+    s = " ".join(ln.strip() for ln in lines if ln.strip())
+
+    # Each pass only runs when the literal text every match needs is present,
+    # so a clean reply skips the substitutions entirely
+    changed = 0
+
+    # Remove “according to … tool” or function-y snippets
+    if "_" in s:
+        s, n = _RE_TOOL_CALLS.subn("", s)
+        changed += n
+    folded = s.casefold()
+    if "tool" in folded:
+        s, n = _RE_TOOL_PHRASES.subn("", s)
+        changed += n
+
+    # Remove URLs and markdown images
+    if "<" in s or "://" in s:
+        s, n = _RE_URLS_TAGS.subn("", s)
+        changed += n
+
+    # Trim banners/disclaimers
+    if changed:
+        folded = s.casefold()
+    if "please note" in folded or "this information is based on" in folded:
+        s = _RE_DISCLAIMER.sub("", s)
+    s = " ".join(s.split())
+
+    # Keep one concise sentence unless asked for a list/table
+    idx = s.find(". ")
+    if idx != -1 and not _RE_LIST_KEYWORDS.search(s):
+        s = s[:idx].rstrip(".") + "."
+    return s
@@ -7,28 +7,73 @@ import logging
 import uuid
 import os
 import base64
-import tempfile
 import json
 import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
 from typing import Dict, Any, Optional, Tuple
-import asyncio  # ✅ added for optional async initialize
+import asyncio  # ✅ async initialize + off-loop STT
 
-import requests
+import importlib.util
+
+import httpx
+import numpy as np
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, validator
 
 # === Original project imports (unchanged interface) ===
 # Keep your original import path; the agent class name is the same.
 from agents import MedicalLangChainAgent
-from auth.auth import get_current_user, UserContext, get_authorized_patient_id
+from auth.auth import get_current_user, UserContext
 
 logger = logging.getLogger(__name__)
 
 # Create API router
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-# Global variables (unchanged)
-session_agents: Dict[str, MedicalLangChainAgent] = {}  # agent instances per session
+# orjson encodes the nested response metadata several times faster than stdlib json
+_JSONResponse = ORJSONResponse if importlib.util.find_spec("orjson") else JSONResponse
+
+# Agent instances per session, least recently used first; the oldest is evicted past
+# MAX_SESSIONS, and any session idle for SESSION_TTL seconds is dropped
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+session_agents: "OrderedDict[str, MedicalLangChainAgent]" = OrderedDict()
+_session_last_used: Dict[str, float] = {}
+# user_id that created each session; only that user may use or delete it
+_session_owner: Dict[str, int] = {}
+
+# Initialized agents kept ready so a new session skips tool/LLM setup on its first turn
+AGENT_POOL_MIN = int(os.getenv("AGENT_POOL_MIN", "4"))
+_agent_pool: "deque[MedicalLangChainAgent]" = deque()
+_pool_refill: Optional[asyncio.Task] = None
+
+# At most CHAT_CONCURRENCY agent turns run at once; the rest queue on the semaphore
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "8"))
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "120"))
+CHAT_SEM = asyncio.Semaphore(CHAT_CONCURRENCY)
+_chat_stats = {"running": 0, "waiting": 0, "timeouts": 0}
+
+# Whisper weights are loaded once per process, on the first voice request
+_WHISPER_MODEL = None
+_WHISPER_FP16 = False
+_WHISPER_LOCK = threading.Lock()
+
+# Environment settings are read once at import, not on every request
+_OPENAI_KEY = os.getenv("OPENAI_API_KEY", "")
+_SARVAM_KEY = os.getenv("SARVAM_API_KEY", "sk_tjglfjfs_JtdOlwApFemE3fxJeZi9eckf").strip()
+_SARVAM_URL = os.getenv("SARVAM_STT_URL", "https://api.sarvam.ai/speech-to-text-translate").strip()
+
+# Audio size bounds, checked on the base64 text before anything is decoded
+_MIN_AUDIO_BYTES = 2000
+_MAX_AUDIO_BYTES = 25 * 1024 * 1024
+_MIN_AUDIO_B64 = 4 * -(-_MIN_AUDIO_BYTES // 3)
+_MAX_AUDIO_B64 = 4 * -(-_MAX_AUDIO_BYTES // 3)
+
+# Pooled keep-alive client for Sarvam STT; HTTP/2 when the h2 extra is installed
+_SARVAM_CLIENT = httpx.AsyncClient(http2=importlib.util.find_spec("h2") is not None, timeout=60)
 
 
 # =========================
@@ -114,7 +159,7 @@ def _strip_data_url_prefix(b64: str) -> Tuple[str, Optional[str]]:
 def _guess_suffix_from_mime(mime: Optional[str]) -> str:
     """Map common audio MIME types to file extensions."""
     if not mime:
-        return ".wav"  # safest default we’ll convert to WAV anyway
+        return ".wav"  # safest default
     mime = mime.lower()
     if "webm" in mime:
         return ".webm"
@@ -131,48 +176,118 @@ def _guess_suffix_from_mime(mime: Optional[str]) -> str:
     return ".wav"
 
 
-def _ensure_wav(audio_path: str) -> str:
+def _decode_to_pcm(audio_bytes: bytes):
     """
-    If the audio file is not WAV, transcode it to 16kHz mono WAV using ffmpeg,
-    then return the path of the WAV file. Requires ffmpeg on PATH.
+    Decode any ffmpeg-readable audio to 16kHz mono float32 PCM, piping through
+    stdin/stdout so nothing touches disk. Requires ffmpeg on PATH.
     """
-    if audio_path.lower().endswith(".wav"):
-        return audio_path
+    proc = subprocess.run(
+        ["ffmpeg", "-nostdin", "-i", "pipe:0", "-ac", "1", "-ar", "16000",
+         "-f", "s16le", "-acodec", "pcm_s16le", "-loglevel", "error", "pipe:1"],
+        input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+    )
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
 
-    wav_path = audio_path + ".wav"
+def _evict_sessions(now: float) -> None:
+    """
+    Drop expired and over-capacity sessions. session_agents is kept in recency
+    order, so both kinds are found at the front. Runs without awaiting, so no
+    other request can interleave on the event loop.
+    """
+    while session_agents:
+        oldest_id = next(iter(session_agents))
+        if len(session_agents) <= MAX_SESSIONS and now - _session_last_used[oldest_id] < SESSION_TTL:
+            break
+        session_agents.popitem(last=False)
+        _session_last_used.pop(oldest_id, None)
+        _session_owner.pop(oldest_id, None)
+        logger.info("♻️ Evicted idle session agent: %.8s...", oldest_id)
+
+
+def _new_agent(openai_api_key: Optional[str] = None) -> MedicalLangChainAgent:
+    """Construct an agent (kept compatible with new/old agent signatures)."""
+    # ✅ Newer agent signature prefers user_context
     try:
-        # ffmpeg -y -i input -ac 1 -ar 16000 -f wav output.wav
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", audio_path, "-ac", "1", "-ar", "16000", "-f", "wav", wav_path],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
-        )
-        return wav_path
-    except Exception as e:
-        logger.error(f"ffmpeg transcoding failed: {e}")
-        # fallback: hand original to Whisper (may still work)
-        return audio_path
+        return MedicalLangChainAgent(user_context={})
+    except TypeError:
+        # ↩️ Fallback for older builds that expected openai_api_key
+        return MedicalLangChainAgent(openai_api_key=openai_api_key or '')
+
 
+def _build_warm_agent() -> MedicalLangChainAgent:
+    """Construct and initialize an agent; runs in a worker thread, off the event loop."""
+    agent = _new_agent(_OPENAI_KEY)
+    # initialize() is async only by signature; its LLM/tool setup is synchronous
+    asyncio.run(_maybe_initialize(agent))
+    return agent
 
-def get_or_create_session_agent(session_id: Optional[str] = None, openai_api_key: Optional[str] = None) -> tuple:
+
+async def fill_agent_pool() -> None:
+    """Top the pool of initialized agents back up to AGENT_POOL_MIN (also run at startup)."""
+    while len(_agent_pool) < AGENT_POOL_MIN:
+        try:
+            agent = await asyncio.to_thread(_build_warm_agent)
+        except Exception as e:
+            logger.error("❌ Failed to prewarm session agent: %s", e)
+            return
+        _agent_pool.append(agent)
+
+
+def _schedule_pool_refill() -> None:
+    global _pool_refill
+    if _pool_refill is None or _pool_refill.done():
+        _pool_refill = asyncio.get_running_loop().create_task(fill_agent_pool())
+
+
+def get_or_create_session_agent(session_id: Optional[str] = None, openai_api_key: Optional[str] = None,
+                                owner_id: Optional[int] = None) -> tuple:
     """Get existing session agent or create new one (kept compatible with new/old agent signatures)."""
     global session_agents
     if not session_id:
         session_id = str(uuid.uuid4())
-    if session_id not in session_agents:
+    now = time.monotonic()
+    _evict_sessions(now)
+    if session_id in session_agents:
+        if _session_owner.get(session_id) != owner_id:
+            # Someone else's conversation: indistinguishable from an unknown id
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_agents.move_to_end(session_id)
+    else:
         try:
-            # ✅ Newer agent signature prefers user_context
-            try:
-                session_agents[session_id] = MedicalLangChainAgent(user_context={})
-            except TypeError:
-                # ↩️ Fallback for older builds that expected openai_api_key
-                session_agents[session_id] = MedicalLangChainAgent(openai_api_key=openai_api_key or '')
-            logger.info(f"✅ Created new session agent for session: {session_id[:8]}...")
+            if _agent_pool:
+                session_agents[session_id] = _agent_pool.popleft()
+                _schedule_pool_refill()
+            else:
+                session_agents[session_id] = _new_agent(openai_api_key)
+            _session_owner[session_id] = owner_id
+            logger.info("✅ Created new session agent for session: %.8s...", session_id)
         except Exception as e:
-            logger.error(f"❌ Failed to create session agent: {e}")
+            logger.error("❌ Failed to create session agent: %s", e)
             return None, session_id
+    _session_last_used[session_id] = now
+    _evict_sessions(now)
     return session_agents[session_id], session_id
 
 
+async def _run_chat(agent: Any, message: str) -> Any:
+    """One agent turn under the global concurrency cap and CHAT_TIMEOUT."""
+    _chat_stats["waiting"] += 1
+    try:
+        await CHAT_SEM.acquire()
+    finally:
+        _chat_stats["waiting"] -= 1
+    _chat_stats["running"] += 1
+    try:
+        return await asyncio.wait_for(agent.chat(message), timeout=CHAT_TIMEOUT)
+    except asyncio.TimeoutError:
+        _chat_stats["timeouts"] += 1
+        raise HTTPException(status_code=504, detail="Medical agent timed out")
+    finally:
+        _chat_stats["running"] -= 1
+        CHAT_SEM.release()
+
+
 async def _maybe_initialize(agent: Any):
     """Initialize agent if it exposes an async initialize() (keeps compatibility with older builds)."""
     try:
@@ -182,42 +297,58 @@ async def _maybe_initialize(agent: Any):
             if asyncio.iscoroutine(res):
                 await res
     except Exception as e:
-        logger.error(f"Agent initialize() failed (continuing): {e}")
+        logger.error("Agent initialize() failed (continuing): %s", e)
+
+
+def _get_whisper_model():
+    """Load the Whisper model on first use and reuse it for every later request."""
+    global _WHISPER_MODEL, _WHISPER_FP16
+    if _WHISPER_MODEL is None:
+        with _WHISPER_LOCK:
+            if _WHISPER_MODEL is None:
+                import whisper
+                try:
+                    import torch
+                    device = "cuda" if torch.cuda.is_available() else "cpu"
+                except Exception:
+                    device = "cpu"
+                model_name = os.getenv("WHISPER_MODEL", "small")
+                _WHISPER_FP16 = device == "cuda"
+                _WHISPER_MODEL = whisper.load_model(model_name, device=device)
+                logger.info("✅ Whisper model '%s' loaded on %s", model_name, device)
+    return _WHISPER_MODEL
 
 
 def _transcribe_with_whisper(audio_bytes: bytes, mime: Optional[str]) -> str:
-    """Whisper transcription, robust to webm/mp4 by transcoding to WAV first."""
-    import whisper
+    """Whisper transcription of webm/mp4/wav/... bytes, decoded in memory by ffmpeg."""
     try:
-        # 1) Save bytes with correct suffix for ffmpeg to parse
-        suffix = _guess_suffix_from_mime(mime)
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
-            f.write(audio_bytes)
-            f.flush()
-            input_path = f.name
-
-        # 2) Convert to wav (16k mono) for reliability
-        wav_path = _ensure_wav(input_path)
-
-        # 3) Transcribe
-        model = whisper.load_model("small")  # use what you had
-        result = model.transcribe(wav_path, fp16=False)  # CPU safe
+        pcm = _decode_to_pcm(audio_bytes)
+        model = _get_whisper_model()
+        result = model.transcribe(pcm, fp16=_WHISPER_FP16)  # fp16 only on CUDA
         text = (result or {}).get("text", "") or ""
         return text.strip()
+    except subprocess.CalledProcessError as e:
+        logger.error("ffmpeg decoding failed: %s", e.stderr.decode(errors='ignore').strip())
+        raise
     except Exception as e:
-        logger.error(f"Whisper transcription failed: {e}")
+        logger.error("Whisper transcription failed: %s", e)
         raise
 
 
-def _transcribe_translate_with_sarvam(audio_bytes: bytes, mime: Optional[str]) -> str:
+async def close_http_clients() -> None:
+    """Close pooled outbound HTTP clients (called from the app lifespan on shutdown)."""
+    await _SARVAM_CLIENT.aclose()
+
+
+async def _transcribe_translate_with_sarvam(audio_bytes: bytes, mime: Optional[str]) -> str:
     """
     Sarvam AI STT + translate-to-English.
     - Auth: header 'api-subscription-key: <key>'
     - Endpoint: prefer /speech-to-text-translate (auto-detects input, returns English)
       Fallback to /speech-to-text if you want same-language transcription.
     """
-    api_key = os.getenv("SARVAM_API_KEY", "sk_tjglfjfs_JtdOlwApFemE3fxJeZi9eckf").strip()
-    sarvam_url = os.getenv("SARVAM_STT_URL", "https://api.sarvam.ai/speech-to-text-translate").strip()
+    api_key = _SARVAM_KEY
+    sarvam_url = _SARVAM_URL
     if not api_key:
         raise RuntimeError("SARVAM_API_KEY is not set in environment.")
 
@@ -227,15 +358,14 @@ def _transcribe_translate_with_sarvam(audio_bytes: bytes, mime: Optional[str]) -
                      audio_bytes,
                      (mime or "application/octet-stream"))
         }
-        resp = requests.post(
+        resp = await _SARVAM_CLIENT.post(
             sarvam_url,
             headers={"api-subscription-key": api_key},
             files=files,
-            timeout=60,
         )
-        if not resp.ok:
+        if not resp.is_success:
             body = resp.text.strip()
-            logger.error(f"Sarvam AI STT failed ({resp.status_code}): {body}")
+            logger.error("Sarvam AI STT failed (%s): %s", resp.status_code, body)
             resp.raise_for_status()
 
         payload = resp.json() if resp.content else {}
@@ -244,10 +374,10 @@ def _transcribe_translate_with_sarvam(audio_bytes: bytes, mime: Optional[str]) -
                 or payload.get("result")
                 or "").strip()
         if not text:
-            logger.error(f"Sarvam AI STT returned empty text. Raw: {payload}")
+            logger.error("Sarvam AI STT returned empty text. Raw: %s", payload)
         return text
     except Exception as e:
-        logger.error(f"Sarvam AI STT failed: {e}")
+        logger.error("Sarvam AI STT failed: %s", e)
         raise
 
 
@@ -255,13 +385,13 @@ def _transcribe_translate_with_sarvam(audio_bytes: bytes, mime: Optional[str]) -
 # Routes
 # =========================
 
-@router.post("/query", response_model=QueryResponse)
+@router.post("/query", response_model=QueryResponse, response_class=_JSONResponse)
 async def handle_query(
     request: QueryRequest, 
     current_user: UserContext = Depends(get_current_user)
 ):
     """Handle medical queries with LangChain agent, session management, and role-based access control"""
-    logger.info(f" Received medical query from user {current_user.user_id} (Role: {current_user.role_name}): {request.query[:100]}...")
+    logger.info(" Received medical query from user %s (Role: %s): %.100s...", current_user.user_id, current_user.role_name, request.query)
 
     try:
         query = request.query.strip()
@@ -273,7 +403,7 @@ async def handle_query(
             raise HTTPException(status_code=400, detail="Query cannot be empty")
 
         # Authorize patient access
-        authorized_patient_id = get_authorized_patient_id(requested_patient_id, current_user)
+        authorized_patient_id = current_user.authorize_patient(requested_patient_id)
 
         # Build context
         if current_user.role_id == 1:  # Patient
@@ -285,13 +415,13 @@ async def handle_query(
                 query_with_context = f"[Medical Staff Query - General] {query}"
 
         logger.info(
-            f" Processing medical query from {current_user.role_name}: "
-            f"'{query[:50]}{'...' if len(query) > 50 else ''}' | "
-            f"Session: {session_id[:8] + '...' if session_id else 'NEW'}"
+            " Processing medical query from %s: '%.50s%s' | Session: %.8s%s",
+            current_user.role_name, query, "..." if len(query) > 50 else "",
+            session_id or "NEW", "..." if session_id else "",
         )
 
         # Session agent
-        session_agent, session_id = get_or_create_session_agent(session_id, os.getenv("OPENAI_API_KEY"))
+        session_agent, session_id = get_or_create_session_agent(session_id, _OPENAI_KEY, current_user.user_id)
 
         # ✅ initialize if needed (keeps compatibility with new agent)
         await _maybe_initialize(session_agent)
@@ -306,8 +436,8 @@ async def handle_query(
                     'authorized_patient_id': authorized_patient_id
                 })
 
-            result = await session_agent.chat(query_with_context)
-            logger.info(f"✅ Medical agent response generated successfully for user {current_user.user_id}")
+            result = await _run_chat(session_agent, query_with_context)
+            logger.info("✅ Medical agent response generated successfully for user %s", current_user.user_id)
 
             result_metadata = result.get("metadata", {}) if isinstance(result, dict) else {}
             result_metadata["session_id"] = session_id
@@ -326,18 +456,87 @@ async def handle_query(
                     "authorized_patient_id": authorized_patient_id
                 }
             )
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"❌ Medical session agent failed: {e}")
+            logger.error("❌ Medical session agent failed: %s", e)
             raise HTTPException(status_code=500, detail=f"Medical agent error: {str(e)}")
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Medical query processing failed: {e}")
+        logger.error("❌ Medical query processing failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.post("/voice", response_model=VoiceQueryResponse)
+@router.post("/query/stream")
+async def handle_query_stream(
+    request: QueryRequest,
+    current_user: UserContext = Depends(get_current_user)
+):
+    """Same as /query, but streams answer tokens as NDJSON lines ending with a 'final' event"""
+    query = request.query.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    # Build context (mirror /query)
+    authorized_patient_id = current_user.authorize_patient(request.patient_id)
+    if current_user.role_id == 1:
+        query_with_context = f"[Patient Query - User ID: {current_user.user_id}] {query}"
+    else:
+        if authorized_patient_id:
+            query_with_context = f"[Medical Staff Query - For Patient ID: {authorized_patient_id}] {query}"
+        else:
+            query_with_context = f"[Medical Staff Query - General] {query}"
+
+    session_agent, session_id = get_or_create_session_agent(request.sessionId, _OPENAI_KEY, current_user.user_id)
+    if session_agent is None or not hasattr(session_agent, "chat_stream"):
+        raise HTTPException(status_code=500, detail="Medical agent error: streaming not available")
+
+    await _maybe_initialize(session_agent)
+    session_agent.set_user_context({
+        'user_id': current_user.user_id,
+        'role_id': current_user.role_id,
+        'role_name': current_user.role_name,
+        'can_access_all_patients': current_user.can_access_all_patients,
+        'authorized_patient_id': authorized_patient_id
+    })
+
+    async def events():
+        # Same concurrency cap and CHAT_TIMEOUT as _run_chat; closing the agent's
+        # stream on timeout or client disconnect rolls back its pending user turn
+        _chat_stats["waiting"] += 1
+        try:
+            await CHAT_SEM.acquire()
+        finally:
+            _chat_stats["waiting"] -= 1
+        _chat_stats["running"] += 1
+        stream = session_agent.chat_stream(query_with_context)
+        try:
+            async with asyncio.timeout(CHAT_TIMEOUT):
+                async for event in stream:
+                    if event.get("type") == "final":
+                        event.setdefault("metadata", {}).update({
+                            "session_id": session_id,
+                            "conversation_length": len(session_agent.get_conversation_history() or []),
+                            "user_role": current_user.role_name,
+                            "authorized_patient_id": authorized_patient_id,
+                        })
+                        event["sessionId"] = session_id
+                    yield json.dumps(event) + "\n"
+        except TimeoutError:
+            _chat_stats["timeouts"] += 1
+            yield json.dumps({"type": "final", "message": "Medical agent timed out",
+                              "metadata": {"error": True}, "sessionId": session_id}) + "\n"
+        finally:
+            await stream.aclose()
+            _chat_stats["running"] -= 1
+            CHAT_SEM.release()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post("/voice", response_model=VoiceQueryResponse, response_class=_JSONResponse)
 async def handle_voice_query(
     request: VoiceQueryRequest,
     current_user: UserContext = Depends(get_current_user)
@@ -345,32 +544,36 @@ async def handle_voice_query(
     """
     Voice:
       - 'regional' → Sarvam AI (configurable URL) + translate to English
-      - 'international' → Whisper (transcode to WAV for reliability)
+      - 'international' → Whisper (decoded to 16kHz PCM in memory via ffmpeg)
     """
     try:
         # 1) Decode base64
         raw_b64, mime = _strip_data_url_prefix(request.audio_base64)
+        if len(raw_b64) > _MAX_AUDIO_B64:
+            raise HTTPException(status_code=413, detail="Audio too large")
+        if len(raw_b64) < _MIN_AUDIO_B64:
+            raise HTTPException(status_code=400, detail="Audio too short or empty")
         try:
             audio_bytes = base64.b64decode(raw_b64, validate=True)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid audio_base64: cannot decode")
 
-        if not audio_bytes or len(audio_bytes) < 2000:
+        if not audio_bytes or len(audio_bytes) < _MIN_AUDIO_BYTES:
             raise HTTPException(status_code=400, detail="Audio too short or empty")
 
-        # 2) STT
+        # 2) STT (blocking ffmpeg / Whisper run off the event loop)
         language = request.language  # normalized
         if language == "regional":
-            transcript = _transcribe_translate_with_sarvam(audio_bytes, mime)
+            transcript = await _transcribe_translate_with_sarvam(audio_bytes, mime)
         else:
-            transcript = _transcribe_with_whisper(audio_bytes, mime)
+            transcript = await asyncio.to_thread(_transcribe_with_whisper, audio_bytes, mime)
 
         if not transcript:
             raise HTTPException(status_code=422, detail="Failed to transcribe audio")
 
         # 3) Build query context (mirror /query)
         requested_patient_id = request.patient_id
-        authorized_patient_id = get_authorized_patient_id(requested_patient_id, current_user)
+        authorized_patient_id = current_user.authorize_patient(requested_patient_id)
 
         if current_user.role_id == 1:
             query_with_context = f"[Patient Query - User ID: {current_user.user_id}] {transcript}"
@@ -381,7 +584,7 @@ async def handle_voice_query(
                 query_with_context = f"[Medical Staff Query - General] {transcript}"
 
         # 4) Session agent
-        session_agent, session_id = get_or_create_session_agent(request.session_id, os.getenv("OPENAI_API_KEY"))
+        session_agent, session_id = get_or_create_session_agent(request.session_id, _OPENAI_KEY, current_user.user_id)
 
         # ✅ initialize if needed (keeps compatibility with new agent)
         await _maybe_initialize(session_agent)
@@ -397,8 +600,8 @@ async def handle_voice_query(
             })
 
         # 6) Ask the agent
-        result = await session_agent.chat(query_with_context)
-        logger.info(f"✅ Voice query processed for user {current_user.user_id}")
+        result = await _run_chat(session_agent, query_with_context)
+        logger.info("✅ Voice query processed for user %s", current_user.user_id)
 
         # 7) Metadata
         result_metadata = result.get("metadata", {}) if isinstance(result, dict) else {}
@@ -427,7 +630,7 @@ async def handle_voice_query(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Voice query processing failed: {e}")
+        logger.error("❌ Voice query processing failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
@@ -459,10 +662,32 @@ async def health_check():
     }
 
 
+@router.get("/stats")
+async def get_chat_stats(current_user: UserContext = Depends(get_current_user)):
+    """Agent concurrency: configured slots, turns running and queued, timeouts so far"""
+    return {"concurrency": CHAT_CONCURRENCY, "timeout_seconds": CHAT_TIMEOUT, **_chat_stats}
+
+
 @router.get("/sessions")
 async def get_active_sessions():
     """Get information about active sessions"""
+    _evict_sessions(time.monotonic())
     return {
         "active_sessions": len(session_agents),
         "session_ids": [session_id[:8] + "..." for session_id in session_agents.keys()]
     }
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: str,
+    current_user: UserContext = Depends(get_current_user)
+):
+    """Free a session's agent and conversation history right away"""
+    if session_id not in session_agents or _session_owner.get(session_id) != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    del session_agents[session_id]
+    _session_last_used.pop(session_id, None)
+    _session_owner.pop(session_id, None)
+    logger.info("🗑️ Session %.8s... closed by user %s", session_id, current_user.user_id)
+    return {"success": True, "sessionId": session_id}
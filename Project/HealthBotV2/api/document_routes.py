@@ -3,18 +3,88 @@ Document Training API Routes
 API endpoints for training hospital documents and creating embeddings
 """
 
+import asyncio
 import logging
-from typing import Optional, List
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import os
+from typing import Optional, List, Dict, Tuple
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from services import training_service, document_query_service
 
+# Optional persistent queue: with REDIS_URL set and arq installed, training jobs go to
+# an arq worker (services/training_worker.py) instead of running in this process
+try:
+    from arq import create_pool
+    from arq.connections import RedisSettings
+    from arq.constants import result_key_prefix
+    from arq.jobs import Job, JobStatus
+    ARQ_AVAILABLE = True
+except ImportError:
+    ARQ_AVAILABLE = False
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+_arq_pool = None
+
 
 logger = logging.getLogger(__name__)
 
 # Create API router
 router = APIRouter(prefix="/api/document", tags=["document"])
 
+# Running training jobs by folder; a repeat request joins the running job
+# instead of starting a second pass over the same folder and index
+_training_jobs: Dict[str, asyncio.Task] = {}
+
+def _start_training(folder_path: Optional[str]) -> Tuple[asyncio.Task, bool]:
+    """Return (task, started) for this folder, reusing a job that is still running."""
+    key = folder_path or training_service.documents_folder
+    task = _training_jobs.get(key)
+    if task is not None and not task.done():
+        return task, False
+
+    task = asyncio.create_task(asyncio.to_thread(training_service.train_documents, folder_path))
+    _training_jobs[key] = task
+
+    def _finished(t: asyncio.Task):
+        if _training_jobs.get(key) is t:
+            del _training_jobs[key]
+        if t.cancelled():
+            logger.warning("⚠️ Training for %s was cancelled", key)
+        elif t.exception():
+            logger.error("❌ Background training failed: %s", t.exception())
+        else:
+            logger.info("✅ Training completed: %s", t.result())
+
+    task.add_done_callback(_finished)
+    return task, True
+
+async def init_training_queue() -> bool:
+    """Connect to the arq queue when configured (called from the app lifespan)."""
+    global _arq_pool
+    if not (ARQ_AVAILABLE and REDIS_URL):
+        return False
+    _arq_pool = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+    return True
+
+async def close_training_queue() -> None:
+    if _arq_pool is not None:
+        await _arq_pool.close()
+
+def _job_id(folder_path: Optional[str]) -> str:
+    # One queued/running job per folder: arq refuses a second job with the same id
+    return f"train:{folder_path or training_service.documents_folder}"
+
+async def _enqueue_training(folder_path: Optional[str]) -> Tuple[str, "Job", bool]:
+    """Return (job_id, job, queued) for this folder, reusing a job that is still queued or running."""
+    job_id = _job_id(folder_path)
+    existing = Job(job_id, _arq_pool)
+    if await existing.status() == JobStatus.complete:
+        # arq also refuses the id while a finished job's result is kept (an hour by
+        # default), so clear it or the folder could not be retrained until it expires
+        await _arq_pool.delete(result_key_prefix + job_id)
+    job = await _arq_pool.enqueue_job("train_task", folder_path, _job_id=job_id)
+    return job_id, job or existing, job is not None
+
 # Request/Response models
 class TrainingRequest(BaseModel):
     folder_path: Optional[str] = None
@@ -27,6 +97,7 @@ class TrainingResponse(BaseModel):
     processed_files: Optional[list] = None
     index_name: Optional[str] = None
     folder_path: Optional[str] = None
+    job_id: Optional[str] = None
     error: Optional[str] = None
 
 class QueryRequest(BaseModel):
@@ -44,21 +115,31 @@ class QueryResponse(BaseModel):
     error: Optional[str] = None
 
 @router.post("/train", response_model=TrainingResponse)
-async def train_documents(request: TrainingRequest, background_tasks: BackgroundTasks):
+async def train_documents(request: TrainingRequest):
     """Train documents and create embeddings (async)"""
     try:
         
-        logger.info(f"📚 Starting document training for folder: {request.folder_path or 'default'}")
-        
-        # Run training in background
-        def run_training():
-            try:
-                result = training_service.train_documents(request.folder_path)
-                logger.info(f"✅ Training completed: {result}")
-            except Exception as e:
-                logger.error(f"❌ Background training failed: {e}")
-        
-        background_tasks.add_task(run_training)
+        if _arq_pool is not None:
+            job_id, _, queued = await _enqueue_training(request.folder_path)
+            logger.info("📚 %s document training job %s", "Queued" if queued else "Already queued", job_id)
+            return TrainingResponse(
+                success=True,
+                message=("Document training queued. Check training status endpoint for progress." if queued
+                         else "Document training is already queued or running for this folder."),
+                folder_path=request.folder_path or "documents/pdf",
+                job_id=job_id
+            )
+
+        _, started = _start_training(request.folder_path)
+        if not started:
+            logger.info("📚 Training already running for folder: %s", request.folder_path or "default")
+            return TrainingResponse(
+                success=True,
+                message="Document training is already running for this folder. Check training status endpoint for progress.",
+                folder_path=request.folder_path or "documents/pdf"
+            )
+
+        logger.info("📚 Starting document training for folder: %s", request.folder_path or "default")
         
         return TrainingResponse(
             success=True,
@@ -69,7 +150,7 @@ async def train_documents(request: TrainingRequest, background_tasks: Background
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Training request failed: {e}")
+        logger.error("❌ Training request failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
 @router.post("/train/sync", response_model=TrainingResponse)
@@ -77,10 +158,17 @@ async def train_documents_sync(request: TrainingRequest):
     """Train documents synchronously and return results"""
     try:
         
-        logger.info(f"📚 Starting synchronous document training for folder: {request.folder_path or 'default'}")
+        logger.info("📚 Starting synchronous document training for folder: %s", request.folder_path or "default")
         
-        # Run training synchronously
-        result = training_service.train_documents(request.folder_path)
+        if _arq_pool is not None:
+            # With the queue configured the worker owns training; wait for its job so this
+            # process never trains the same folder alongside it
+            _, job, _ = await _enqueue_training(request.folder_path)
+            result = await job.result(timeout=None)
+        else:
+            # Run training to completion in a worker thread (or join the running job for this folder)
+            task, _ = _start_training(request.folder_path)
+            result = await asyncio.shield(task)
         
         if result.get("success"):
             return TrainingResponse(
@@ -103,29 +191,34 @@ async def train_documents_sync(request: TrainingRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Synchronous training failed: {e}")
+        logger.error("❌ Synchronous training failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
 @router.get("/status")
-async def get_training_status():
-    """Get current document training status"""
+async def get_training_status(job_id: Optional[str] = None):
+    """Get current document training status (and a queued job's state when job_id is given)"""
     try:
         
         status = training_service.get_training_status()
+        if isinstance(status, dict):
+            status["running_jobs"] = sorted(_training_jobs)
+            if job_id and _arq_pool is not None:
+                status["job"] = {"job_id": job_id, "status": str(await Job(job_id, _arq_pool).status())}
         return status
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Failed to get training status: {e}")
+        logger.error("❌ Failed to get training status: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get training status: {str(e)}")
 
 @router.post("/query", response_model=QueryResponse)
 async def query_documents(request: QueryRequest):
     """Query documents using RAG (Retrieval-Augmented Generation)"""
     try:        
-        # Use the document query service
-        result = document_query_service.query_documents(
+        # Use the document query service (blocking OpenAI/Pinecone calls run off the event loop)
+        result = await asyncio.to_thread(
+            document_query_service.query_documents,
             query=request.query,
             top_k=request.top_k or 5,
             max_tokens=request.max_tokens or 150,
@@ -154,7 +247,7 @@ async def query_documents(request: QueryRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Document query endpoint failed: {e}")
+        logger.error("❌ Document query endpoint failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 @router.get("/")
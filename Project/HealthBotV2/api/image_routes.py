@@ -1,30 +1,241 @@
-from fastapi import APIRouter, HTTPException, Query, Response
-from urllib.parse import unquote, urljoin
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlsplit, urlunsplit
+import asyncio
+import hashlib
 import httpx
+import importlib.util
+import ipaddress
+import logging
+import os
 import re
+import socket
+import time
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/image", tags=["image"])
 
+# og:/twitter: meta tags live in <head>, so only the start of a page is parsed
+HTML_SNIFF_BYTES = 65536
+# Proxied bodies are streamed in chunks and cut off past this size
+PROXY_CHUNK_BYTES = 64 * 1024
+MAX_PROXY_BYTES = 20 * 1024 * 1024
+
+# Small images are kept in-process (LRU, bounded by total bytes) for PROXY_CACHE_TTL
+PROXY_CACHE_TTL = 3600
+PROXY_CACHE_ITEM_MAX = 2 * 1024 * 1024
+PROXY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_CONTROL = f"public, max-age={PROXY_CACHE_TTL}"
+# url -> (expires_at, content_type, body, etag)
+_proxy_cache: "OrderedDict[str, Tuple[float, str, bytes, str]]" = OrderedDict()
+_proxy_cache_bytes = 0
+
+# Comma-separated hosts the proxy may fetch from (subdomains included); empty allows any public host
+PROXY_ALLOWED_HOSTS = frozenset(
+    h.strip().lower().lstrip(".") for h in os.getenv("PROXY_ALLOWED_HOSTS", "").split(",") if h.strip()
+)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# host -> expires_at, for hosts that recently resolved to public addresses only
+HOST_CHECK_TTL = 300
+HOST_CHECK_MAX = 4096
+_public_hosts: Dict[str, float] = {}
+
+def _canonical_url(raw: str) -> Optional[str]:
+    """Lower-cased scheme/host, default port and fragment dropped; None if not an absolute http(s) URL."""
+    try:
+        parts = urlsplit(raw.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if scheme not in _DEFAULT_PORTS or not host:
+        return None
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+def _host_allowed(host: str) -> bool:
+    if not PROXY_ALLOWED_HOSTS:
+        return True
+    labels = host.lower().split(".")
+    return any(".".join(labels[i:]) in PROXY_ALLOWED_HOSTS for i in range(len(labels)))
+
+async def _ensure_public_host(host: str):
+    """Refuse hosts that resolve to private, loopback, link-local or reserved addresses (SSRF)."""
+    expires_at = _public_hosts.get(host)
+    if expires_at is not None and expires_at > time.monotonic():
+        return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise HTTPException(400, "Unresolvable host")
+    for *_, sockaddr in infos:
+        if not ipaddress.ip_address(sockaddr[0].split("%", 1)[0]).is_global:
+            raise HTTPException(403, "Host not allowed")
+    if len(_public_hosts) >= HOST_CHECK_MAX:
+        _public_hosts.clear()
+    _public_hosts[host] = time.monotonic() + HOST_CHECK_TTL
+
+async def _check_upstream(request: httpx.Request):
+    """Runs for every upstream request, including redirects and extracted image URLs."""
+    host = request.url.host
+    if not _host_allowed(host):
+        raise HTTPException(403, "Host not allowed")
+    await _ensure_public_host(host)
+
 OG_IMG_META = re.compile(
     r'<meta[^>]+(?:property|name)=["\'](?:og:image|twitter:image)["\'][^>]*content=["\']([^"\']+)["\']',
     flags=re.IGNORECASE,
 )
 IMG_TAG = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']', flags=re.IGNORECASE)
+OG_IMG_SELECTOR = ", ".join(
+    f'meta[{attr}="{name}"]' for attr in ("property", "name") for name in ("og:image", "twitter:image")
+)
+
+def _find_image_candidate(html: str) -> Optional[str]:
+    """og:image / twitter:image, else the first <img src>; C parser when available, regex otherwise."""
+    head = html[:HTML_SNIFF_BYTES]
+    # Substring checks are far cheaper than parsing; most pages miss one of the two
+    lowered = head.lower()
+    has_meta = "og:image" in lowered or "twitter:image" in lowered
+    has_img = "<img" in lowered
+    if not (has_meta or has_img):
+        return None
+    if HTMLParser is not None:
+        tree = HTMLParser(head)
+        node = tree.css_first(OG_IMG_SELECTOR) if has_meta else None
+        candidate = node.attributes.get("content") if node else None
+        if not candidate and has_img:
+            node = tree.css_first("img[src]")
+            candidate = node.attributes.get("src") if node else None
+        return candidate or None
+    m = (has_meta and OG_IMG_META.search(head)) or (has_img and IMG_TAG.search(head))
+    return m.group(1) if m else None
+
+# One pooled client per process: repeat hosts reuse warm TCP/TLS connections
+_PROXY_CLIENT = httpx.AsyncClient(
+    http2=importlib.util.find_spec("h2") is not None,
+    follow_redirects=True,
+    timeout=httpx.Timeout(12.0, connect=6.0),
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+    event_hooks={"request": [_check_upstream]},
+)
+
+async def close_http_clients() -> None:
+    """Close the pooled proxy client (called from the app lifespan on shutdown)."""
+    await _PROXY_CLIENT.aclose()
+
+async def _open(url: str, headers: dict) -> httpx.Response:
+    """Send the request but leave the body unread; callers must stream or aclose() it."""
+    request = _PROXY_CLIENT.build_request("GET", url, headers=headers)
+    return await _PROXY_CLIENT.send(request, stream=True)
+
+def _too_large(r: httpx.Response) -> bool:
+    length = r.headers.get("content-length", "")
+    return length.isdigit() and int(length) > MAX_PROXY_BYTES
+
+def _cache_get(url: str) -> Optional[Tuple[float, str, bytes, str]]:
+    global _proxy_cache_bytes
+    hit = _proxy_cache.get(url)
+    if hit is None:
+        return None
+    if hit[0] <= time.monotonic():
+        del _proxy_cache[url]
+        _proxy_cache_bytes -= len(hit[2])
+        return None
+    _proxy_cache.move_to_end(url)
+    return hit
+
+def _cache_put(url: str, media_type: str, body: bytes):
+    global _proxy_cache_bytes
+    old = _proxy_cache.pop(url, None)
+    if old is not None:
+        _proxy_cache_bytes -= len(old[2])
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    _proxy_cache[url] = (time.monotonic() + PROXY_CACHE_TTL, media_type, body, etag)
+    _proxy_cache_bytes += len(body)
+    while _proxy_cache_bytes > PROXY_CACHE_MAX_BYTES:
+        _, evicted = _proxy_cache.popitem(last=False)
+        _proxy_cache_bytes -= len(evicted[2])
+
+async def _sniff(chunks) -> bytes:
+    """Read at most HTML_SNIFF_BYTES (rounded up to a chunk), leaving the rest of chunks unread."""
+    head = bytearray()
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= HTML_SNIFF_BYTES:
+            break
+    return bytes(head)
 
-async def _fetch(url: str, headers: dict) -> httpx.Response:
-    timeout = httpx.Timeout(12.0, connect=6.0)
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=timeout) as client:
-        return await client.get(url)
+async def _chained(head: bytes, chunks):
+    if head:
+        yield head
+    async for chunk in chunks:
+        yield chunk
+
+async def _body_chunks(r: httpx.Response, cache_key: Optional[str] = None, media_type: str = "",
+                       chunks=None):
+    """
+    Pass the upstream body through in constant memory, capped at MAX_PROXY_BYTES
+    whatever the content-length said (chunked bodies carry none).
+    With a cache_key, a body that completes within PROXY_CACHE_ITEM_MAX is also cached.
+    chunks overrides r.aiter_bytes(), e.g. to replay an already sniffed head.
+    """
+    sent = 0
+    kept: Optional[list] = [] if cache_key else None
+    try:
+        async for chunk in chunks if chunks is not None else r.aiter_bytes(PROXY_CHUNK_BYTES):
+            sent += len(chunk)
+            if sent > MAX_PROXY_BYTES:
+                logger.warning("Proxy body from %s exceeded %s bytes; truncated", r.url, MAX_PROXY_BYTES)
+                kept = None
+                break
+            if kept is not None:
+                if sent <= PROXY_CACHE_ITEM_MAX:
+                    kept.append(chunk)
+                else:
+                    kept = None
+            yield chunk
+        if kept is not None:
+            _cache_put(cache_key, media_type, b"".join(kept))
+    finally:
+        await r.aclose()
+
+def _stream(r: httpx.Response, media_type: str, cache_key: Optional[str] = None, chunks=None) -> StreamingResponse:
+    return StreamingResponse(
+        _body_chunks(r, cache_key, media_type, chunks), media_type=media_type, headers={"cache-control": CACHE_CONTROL}
+    )
 
 @router.get("/proxy")
-async def proxy(u: str = Query(..., description="URL-encoded absolute image (or page) URL")):
+async def proxy(request: Request, u: str = Query(..., description="URL-encoded absolute image (or page) URL")):
     """
     Same-origin image proxy to bypass Referer/CORS/hotlinking blocks.
     If the URL is a page (text/html), attempt to extract og:image/twitter:image/first <img>.
     """
-    url = unquote(u or "")
-    if not url.lower().startswith(("http://", "https://")):
+    url = _canonical_url(unquote(u or ""))
+    if url is None:
         raise HTTPException(400, "Invalid URL")
+    if not _host_allowed(urlsplit(url).hostname):
+        raise HTTPException(403, "Host not allowed")
+
+    # 0) Serve recently proxied images from memory (304 when the client already has them)
+    hit = _cache_get(url)
+    if hit is not None:
+        _, media_type, body, etag = hit
+        cache_headers = {"cache-control": CACHE_CONTROL, "etag": etag}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
+        return Response(content=body, media_type=media_type, headers=cache_headers)
 
     headers = {
         "referer": "",  # drop Referer to avoid hotlink blocks
@@ -32,36 +243,49 @@ async def proxy(u: str = Query(..., description="URL-encoded absolute image (or
         "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/*,*/*;q=0.8",
     }
 
-    # 1) Fetch upstream
-    r = await _fetch(url, headers)
+    # 1) Fetch upstream (headers only; the body is streamed or read below)
+    r = await _open(url, headers)
     if r.status_code >= 400:
+        await r.aclose()
         raise HTTPException(r.status_code, f"Upstream returned {r.status_code}")
+    if _too_large(r):
+        await r.aclose()
+        raise HTTPException(413, "Upstream content too large")
 
     ctype = r.headers.get("content-type", "")
-    content = r.content or b""
 
-    # 2) If already an image, return as-is
+    # 2) If already an image, stream it through as-is
     if ctype.startswith("image/"):
-        return Response(content=content, media_type=ctype or "image/jpeg")
+        return _stream(r, ctype or "image/jpeg", cache_key=url)
 
     # 3) If HTML, extract a best-guess image and fetch that
     if "text/html" in ctype.lower():
-        html = r.text or ""
-        # Try og:image / twitter:image
-        m = OG_IMG_META.search(html)
-        candidate = m.group(1) if m else None
-        # Fallback: first <img src="...">
-        if not candidate:
-            m2 = IMG_TAG.search(html)
-            if m2:
-                candidate = m2.group(1)
+        # Only the head is needed to find og:image; the rest is never buffered
+        chunks = r.aiter_bytes(PROXY_CHUNK_BYTES)
+        head = await _sniff(chunks)
+        candidate = _find_image_candidate(head.decode(r.encoding or "utf-8", errors="replace"))
 
         if candidate:
             # Resolve relative paths against page URL
-            cand_abs = urljoin(r.url, candidate)
-            r2 = await _fetch(cand_abs, headers | {"accept": "image/*,*/*;q=0.8"})
-            if r2.status_code < 400 and r2.headers.get("content-type", "").startswith("image/"):
-                return Response(content=r2.content, media_type=r2.headers.get("content-type", "image/jpeg"))
+            cand_abs = urljoin(str(r.url), candidate)
+            try:
+                r2 = await _open(cand_abs, headers | {"accept": "image/*,*/*;q=0.8"})
+            except Exception as e:
+                # Blocked/private host, data: or other unsupported URL, connect error:
+                # fall back to the page itself
+                logger.warning("Image candidate %s from %s failed: %s", cand_abs, url, e)
+                r2 = None
+            except BaseException:
+                await r.aclose()
+                raise
+            if r2 is not None:
+                r2_type = r2.headers.get("content-type", "")
+                if r2.status_code < 400 and r2_type.startswith("image/") and not _too_large(r2):
+                    await r.aclose()
+                    return _stream(r2, r2_type or "image/jpeg", cache_key=url)
+                await r2.aclose()
+
+        return _stream(r, ctype, chunks=_chained(head, chunks))
 
-    # 4) Fallback: return original bytes/content-type
-    return Response(content=content, media_type=ctype or "application/octet-stream")
+    # 4) Fallback: pass the original bytes/content-type through
+    return _stream(r, ctype or "application/octet-stream")
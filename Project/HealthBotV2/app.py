@@ -4,27 +4,40 @@ Revival Medical System FastAPI Application
 Hospital chatbot API with LangChain agent and conversation memory
 """
 
+import asyncio
+import importlib.util
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# LangChain imports
-try:
-    from langchain.agents import create_openai_tools_agent, AgentExecutor
-    from langchain_community.chat_models import ChatOllama
-    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-    from langchain.schema import HumanMessage, AIMessage
-    LANGCHAIN_AVAILABLE = True
-except ImportError as e:
-    LANGCHAIN_AVAILABLE = False
-    print(f"LangChain not available: {e}")
-    print("Install with: pip install langchain langchain-community")
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _HealthCheckFilter(logging.Filter):
+    """Drop uvicorn access-log lines for health probes"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        return not (isinstance(args, tuple) and len(args) > 2 and str(args[2]).endswith("/health"))
+
+
+logging.getLogger("uvicorn.access").addFilter(_HealthCheckFilter())
+
+# LangChain is imported lazily by the agent; only check that it is installed
+LANGCHAIN_AVAILABLE = importlib.util.find_spec("langchain") is not None
+if not LANGCHAIN_AVAILABLE:
+    logger.warning("LangChain not available")
+    logger.warning("Install with: pip install langchain langchain-community")
 
 # Import medical system components
 try:
@@ -33,16 +46,16 @@ try:
 except ImportError as e:
     init_database = None
     MCP_AVAILABLE = False
-    print(f"Medical system not available: {e}")
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+    logger.warning(f"Medical system not available: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("🔧 Starting Revival Medical System initialization...")
+
+    # Python 3.12+: let tasks that finish without suspending skip a scheduler round-trip
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
     
     try:
         # Initialize database
@@ -55,6 +68,22 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("⚠️ Database initialization not available")
         
+        # Training queue (only when REDIS_URL is configured)
+        try:
+            from api.document_routes import init_training_queue
+            if await init_training_queue():
+                logger.info("✅ Document training queue connected")
+        except Exception as queue_error:
+            logger.warning(f"⚠️ Document training queue unavailable, training runs in-process: {queue_error}")
+        
+        # Prewarm session agents so the first chats skip agent setup
+        try:
+            from api.chat_routes import fill_agent_pool
+            await fill_agent_pool()
+            logger.info("✅ Session agent pool prewarmed")
+        except Exception as pool_error:
+            logger.warning(f"⚠️ Session agent prewarm failed: {pool_error}")
+        
         # Summary
         logger.info("🚀 Revival Medical System API started successfully!")
         logger.info(f"📊 Component Status:")
@@ -67,21 +96,59 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Failed to initialize medical system: {e}")
     
     yield
+
+    try:
+        from api.chat_routes import close_http_clients as close_chat_clients
+        from api.image_routes import close_http_clients as close_image_clients
+        await close_chat_clients()
+        await close_image_clients()
+    except Exception as e:
+        logger.warning(f"Failed to close HTTP clients: {e}")
+
+    try:
+        from api.document_routes import close_training_queue
+        await close_training_queue()
+    except Exception as e:
+        logger.warning(f"Failed to close training queue: {e}")
     
     logger.info("🛑 Revival Medical System API shutdown complete")
 
-# Initialize FastAPI app with lifespan
+# Initialize FastAPI app with lifespan; JSON is encoded with orjson when it is installed
 app = FastAPI(
     title="Revival Medical System API",
     description="Hospital chatbot API with LangChain agent and conversation memory",
     version="1.0.0",
+    default_response_class=ORJSONResponse if importlib.util.find_spec("orjson") else JSONResponse,
     lifespan=lifespan
 )
 
+# Images are already compressed and NDJSON streams must not sit in the compressor buffer
+_GZIP_SKIP_PREFIXES = ("/api/image/", "/api/chat/query/stream")
+
+
+class _SelectiveGZipMiddleware:
+    """GZipMiddleware that passes excluded paths straight through"""
+
+    def __init__(self, app, **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(_GZIP_SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+app.add_middleware(_SelectiveGZipMiddleware, minimum_size=512, compresslevel=5)
+
+# Comma-separated list of allowed origins; "*" (the default) allows any origin
+ALLOWED_ORIGINS = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "*").split(",") if o.strip()]
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
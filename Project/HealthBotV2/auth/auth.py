@@ -5,14 +5,19 @@ Uses tokens stored in the database instead of JWT
 """
 
 import os
+import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Tuple
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from sqlalchemy import select
 
-from dal.database import DatabaseManager
+from dal.database import DatabaseManager, get_async_session
 from dal.models.users import Users
 from dal.models.role import Role
 
@@ -21,8 +26,20 @@ logger = logging.getLogger(__name__)
 # Security scheme
 security = HTTPBearer()
 
-class UserContext(BaseModel):
-    """User context for authorization"""
+# Patient authorizers: (user_context, requested_patient_id) -> authorized patient ID,
+# or None for "all patients". Picked once per UserContext instead of per request.
+def _authorize_any_patient(user: "UserContext", requested_patient_id: Optional[int]) -> Optional[int]:
+    return requested_patient_id or None
+
+def _authorize_own_record(user: "UserContext", requested_patient_id: Optional[int]) -> Optional[int]:
+    return user.user_id
+
+def _authorize_nothing(user: "UserContext", requested_patient_id: Optional[int]) -> Optional[int]:
+    raise HTTPException(status_code=403, detail="Cannot determine authorized patient access")
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class UserContext:
+    """User context for authorization (immutable; instances are shared through the auth cache)"""
     user_id: int
     role_id: int
     role_name: str
@@ -31,8 +48,62 @@ class UserContext(BaseModel):
     token: str
     can_access_all_patients: bool = False
 
-def get_user_by_token(token: str) -> Optional[Users]:
-    """Get user from database by token"""
+    _authorizer: Callable[["UserContext", Optional[int]], Optional[int]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.can_access_all_patients:
+            authorizer = _authorize_any_patient
+        elif self.role_id == Role.PATIENT:
+            authorizer = _authorize_own_record
+        else:
+            authorizer = _authorize_nothing
+        object.__setattr__(self, "_authorizer", authorizer)
+
+    def authorize_patient(self, requested_patient_id: Optional[int]) -> Optional[int]:
+        """Authorized patient ID for a request (None means all patients); raises 403 when denied"""
+        return self._authorizer(self, requested_patient_id)
+
+# Resolved tokens are reused for a short while so most requests skip the DB.
+# Keys are SHA-256 digests, so raw tokens are never held as cache keys.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = 10_000
+_auth_cache: "OrderedDict[bytes, Tuple[float, UserContext]]" = OrderedDict()
+
+# Role tables are built once at import; auth runs on every request
+_ROLE_NAMES: Dict[int, str] = {
+    Role.PATIENT: "Patient",
+    Role.DOCTOR: "Doctor",
+    Role.HEALTH_COACH: "Health Coach",
+    Role.ADMIN: "Admin",
+    Role.DIAGNOSTIC: "Diagnostic",
+    Role.VIDEO_UPLOADER: "Video Uploader",
+    Role.TRAINER: "Trainer",
+    Role.TRACKER: "Tracker",
+    Role.CRM_ADMIN: "CRM Admin",
+    Role.CRM_EXECUTIVE: "CRM Executive",
+    Role.VENDOR: "Vendor",
+    Role.ORDER_MANAGER: "Order Manager",
+    Role.VIDEO_ADMIN: "Video Admin",
+    Role.READ_ONLY: "Read Only"
+}
+
+# Roles that can access all patient data
+_PRIVILEGED_ROLES = frozenset({
+    Role.DOCTOR,
+    Role.HEALTH_COACH,
+    Role.ADMIN,
+    Role.DIAGNOSTIC,
+    Role.CRM_ADMIN,
+    Role.CRM_EXECUTIVE
+})
+
+_MEDICAL_STAFF_ROLES = frozenset({Role.DOCTOR, Role.HEALTH_COACH, Role.DIAGNOSTIC})
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def _get_user_by_token_sync(token: str) -> Optional[Users]:
+    """Get user from database by token (sync session; fallback without aiomysql)"""
     try:
         with DatabaseManager() as db_manager:
             if not db_manager.db:
@@ -48,42 +119,34 @@ def get_user_by_token(token: str) -> Optional[Users]:
             return user
             
     except Exception as e:
-        logger.error(f"Error getting user by token: {e}")
+        logger.error("Error getting user by token: %s", e)
+        return None
+
+async def get_user_by_token(token: str) -> Optional[Users]:
+    """Get user from database by token without blocking the event loop"""
+    session = get_async_session()
+    if session is None:
+        return await asyncio.to_thread(_get_user_by_token_sync, token)
+    try:
+        async with session:
+            result = await session.execute(
+                select(Users).where(
+                    Users.token == token,
+                    Users.status == 1  # Active users only
+                )
+            )
+            return result.scalars().first()
+    except Exception as e:
+        logger.error("Error getting user by token: %s", e)
         return None
 
 def get_role_name(role_id: int) -> str:
     """Get role name from role ID"""
-    role_mapping = {
-        Role.PATIENT: "Patient",
-        Role.DOCTOR: "Doctor",
-        Role.HEALTH_COACH: "Health Coach",
-        Role.ADMIN: "Admin",
-        Role.DIAGNOSTIC: "Diagnostic",
-        Role.VIDEO_UPLOADER: "Video Uploader",
-        Role.TRAINER: "Trainer",
-        Role.TRACKER: "Tracker",
-        Role.CRM_ADMIN: "CRM Admin",
-        Role.CRM_EXECUTIVE: "CRM Executive",
-        Role.VENDOR: "Vendor",
-        Role.ORDER_MANAGER: "Order Manager",
-        Role.VIDEO_ADMIN: "Video Admin",
-        Role.READ_ONLY: "Read Only"
-    }
-    return role_mapping.get(role_id, "Unknown")
+    return _ROLE_NAMES.get(role_id, "Unknown")
 
 def determine_access_level(role_id: int) -> bool:
     """Determine if role can access all patients"""
-    # Roles that can access all patient data
-    privileged_roles = [
-        Role.DOCTOR,
-        Role.HEALTH_COACH,
-        Role.ADMIN,
-        Role.DIAGNOSTIC,
-        Role.CRM_ADMIN,
-        Role.CRM_EXECUTIVE
-    ]
-    
-    return role_id in privileged_roles
+    return role_id in _PRIVILEGED_ROLES
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserContext:
     """Get current authenticated user with role-based access control using database token"""
@@ -93,9 +156,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         
         if not token:
             raise HTTPException(status_code=401, detail="Token is required")
+
+        key = _token_key(token)
+        cached = _auth_cache.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                return cached[1]
+            _auth_cache.pop(key, None)
         
         # Get user from database by token
-        user = get_user_by_token(token)
+        user = await get_user_by_token(token)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid token or user not found")
         
@@ -104,7 +174,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         role_name = get_role_name(user.role_id)
         full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
         
-        return UserContext(
+        user_context = UserContext(
             user_id=user.id,
             role_id=user.role_id,
             role_name=role_name,
@@ -113,11 +183,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             token=token,
             can_access_all_patients=can_access_all
         )
+        _auth_cache[key] = (time.monotonic() + AUTH_CACHE_TTL, user_context)
+        while len(_auth_cache) > AUTH_CACHE_SIZE:
+            _auth_cache.popitem(last=False)
+        return user_context
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in get_current_user: {e}")
+        logger.error("Error in get_current_user: %s", e)
         raise HTTPException(status_code=500, detail="Authentication error")
 
 def require_patient_access(requested_patient_id: Optional[int], current_user: UserContext) -> bool:
@@ -148,33 +222,16 @@ def require_patient_access(requested_patient_id: Optional[int], current_user: Us
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in require_patient_access: {e}")
+        logger.error("Error in require_patient_access: %s", e)
         raise HTTPException(status_code=500, detail="Authorization error")
 
-def get_authorized_patient_id(requested_patient_id: Optional[int], current_user: UserContext) -> int:
-    """Get the authorized patient ID based on user role and request"""
-    try:
-        # If user can access all patients and a specific patient is requested
-        if current_user.can_access_all_patients and requested_patient_id:
-            return requested_patient_id
-        
-        # If user can access all patients but no specific patient requested, return None to indicate "all patients"
-        elif current_user.can_access_all_patients and not requested_patient_id:
-            return None
-        
-        # If user is a patient, always return their own ID
-        elif current_user.role_id == Role.PATIENT:
-            return current_user.user_id
-        
-        # Default fallback
-        else:
-            raise HTTPException(status_code=403, detail="Cannot determine authorized patient access")
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error in get_authorized_patient_id: {e}")
-        raise HTTPException(status_code=500, detail="Authorization error")
+def get_authorized_patient_id(requested_patient_id: Optional[int], current_user: UserContext) -> Optional[int]:
+    """Get the authorized patient ID based on user role and request.
+
+    Staff with full access get the requested patient (None means all patients),
+    patients always get their own ID, and every other role is refused with 403.
+    """
+    return current_user.authorize_patient(requested_patient_id)
 
 # Role-based decorators
 def require_roles(*allowed_roles):
@@ -199,7 +256,6 @@ def require_admin(current_user: UserContext = Depends(get_current_user)) -> User
 
 def require_medical_staff(current_user: UserContext = Depends(get_current_user)) -> UserContext:
     """Require medical staff roles (Doctor, Health Coach, Diagnostic)"""
-    medical_roles = [Role.DOCTOR, Role.HEALTH_COACH, Role.DIAGNOSTIC]
-    if current_user.role_id not in medical_roles:
+    if current_user.role_id not in _MEDICAL_STAFF_ROLES:
         raise HTTPException(status_code=403, detail="Medical staff access required")
     return current_user
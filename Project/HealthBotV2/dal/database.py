@@ -4,15 +4,30 @@ Database models for Revival Medical System
 Main database manager and connection handling - Service Layer Pattern
 """
 
+import copy
 import os
 import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional, Iterable
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, DisconnectionError
 from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
+# Optional async driver for the per-request auth lookup; sync pymysql stays the default
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+    import aiomysql  # noqa: F401
+    ASYNC_DB_AVAILABLE = True
+except ImportError:
+    ASYNC_DB_AVAILABLE = False
+
 # Import all model classes that might be needed
 from .models.users import Users
 from .models.glucose_readings import GlucoseReadings
@@ -40,11 +55,27 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Database setup
-Base = declarative_base()
+# Database setup (single declarative registry shared by every model)
+from .models.base import Base
 engine = None
 SessionLocal = None
-
+# Set once init_database() succeeds; hot paths test this instead of SessionLocal
+_INITIALIZED = False
+_NOT_INITIALIZED_MSG = "Database not initialized. Call init_database() first."
+async_engine = None
+AsyncSessionLocal = None
+
+# Sync connection pool; each DatabaseManager holds one connection while it is open
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "20"))
+MYSQL_MAX_OVERFLOW = int(os.getenv("MYSQL_MAX_OVERFLOW", "20"))
+MYSQL_POOL_TIMEOUT = int(os.getenv("MYSQL_POOL_TIMEOUT", "10"))
+MYSQL_POOL_RECYCLE = int(os.getenv("MYSQL_POOL_RECYCLE", "1800"))
+# Unconditional SELECT 1 on every checkout (dev / PgBouncer-style proxies); off by default.
+# Otherwise only connections idle longer than MYSQL_PING_IDLE seconds are pinged.
+MYSQL_POOL_PRE_PING = os.getenv("MYSQL_POOL_PRE_PING", "false").lower() == "true"
+MYSQL_PING_IDLE = int(os.getenv("MYSQL_PING_IDLE", "300"))
+
+@lru_cache(maxsize=1)
 def get_database_url() -> str:
     """Get MySQL database URL"""
     host = os.getenv("MYSQL_HOST", "revival365ai-db.chisukc6ague.ap-south-1.rds.amazonaws.com")
@@ -54,40 +85,105 @@ def get_database_url() -> str:
     password = os.getenv("MYSQL_PASSWORD", "MvqHf1QnpP1F1UqT57Pr")
     return f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
 
+def _mark_checkin(dbapi_connection, connection_record):
+    connection_record.info["checked_in_at"] = time.monotonic()
+
+def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+    """Ping connections that sat idle long enough to have been dropped; the pool replaces dead ones"""
+    checked_in_at = connection_record.info.get("checked_in_at")
+    if checked_in_at is None or time.monotonic() - checked_in_at < MYSQL_PING_IDLE:
+        return
+    try:
+        dbapi_connection.ping(False)
+    except Exception as e:
+        raise DisconnectionError(f"Idle connection failed ping: {e}") from e
+
 def init_database():
     """Initialize database connection and create tables"""
-    global engine, SessionLocal
+    global engine, SessionLocal, _INITIALIZED
+
+    # Re-inits (reloads, repeated DatabaseManager bootstraps) keep the existing pool
+    if engine is not None and _INITIALIZED:
+        return True
 
     try:
         database_url = get_database_url()
-        logger.info(f"Connecting to database: {database_url}")
+        logger.info(f"Connecting to database: {_url_for_log(database_url)}")
 
         # Create engine for MySQL with connection pooling
         engine = create_engine(
             database_url,
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10,
-            pool_recycle=3600,
-            pool_timeout=30
+            poolclass=QueuePool,
+            pool_pre_ping=MYSQL_POOL_PRE_PING,
+            pool_size=MYSQL_POOL_SIZE,
+            max_overflow=MYSQL_MAX_OVERFLOW,
+            pool_recycle=MYSQL_POOL_RECYCLE,
+            pool_timeout=MYSQL_POOL_TIMEOUT
         )
 
+        if not MYSQL_POOL_PRE_PING:
+            event.listen(engine, "checkin", _mark_checkin)
+            event.listen(engine, "checkout", _ping_if_idle)
+
         # Create session factory
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-        logger.info("Database connection established successfully")
+        # Any write through these sessions drops the affected users' cached lookups
+        event.listen(SessionLocal, "after_flush", _invalidate_flushed_users)
+        _INITIALIZED = True
+
+        logger.info(
+            f"Database connection established successfully (pool_size={MYSQL_POOL_SIZE}, "
+            f"max_overflow={MYSQL_MAX_OVERFLOW}, pool_timeout={MYSQL_POOL_TIMEOUT}s, "
+            f"pool_recycle={MYSQL_POOL_RECYCLE}s, pre_ping={MYSQL_POOL_PRE_PING})"
+        )
         return True
 
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         return False
 
+def _url_for_log(database_url: str) -> str:
+    return make_url(database_url).render_as_string(hide_password=True)
+
 def get_db() -> Session:
-    """Get database session"""
-    if SessionLocal is None:
-        raise Exception("Database not initialized. Call init_database() first.")
+    """Get a new database session (the caller closes it)"""
+    if not _INITIALIZED:
+        raise RuntimeError(_NOT_INITIALIZED_MSG)
     return SessionLocal()
 
+def init_async_database() -> bool:
+    """Create the async engine (aiomysql) used by hot-path lookups such as auth"""
+    global async_engine, AsyncSessionLocal
+
+    if AsyncSessionLocal is not None:
+        return True
+    if not ASYNC_DB_AVAILABLE:
+        return False
+
+    try:
+        async_url = get_database_url().replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+        async_engine = create_async_engine(
+            async_url,
+            pool_pre_ping=True,
+            pool_size=20,
+            max_overflow=10,
+            pool_recycle=3600,
+            pool_timeout=30
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        logger.info("Async database engine created successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Async database initialization failed: {e}")
+        return False
+
+def get_async_session() -> Optional["AsyncSession"]:
+    """Get an async database session, or None when the async driver is unavailable"""
+    if AsyncSessionLocal is None and not init_async_database():
+        return None
+    return AsyncSessionLocal()
+
 # -------------------------
 # Helpers for stable order
 # -------------------------
@@ -146,26 +242,134 @@ def _stable_sort_food_entries(
     items.sort(key=keyer, reverse=newest_first)
     return items
 
+# Short-lived cache for rarely-changing lookups repeated within a chat turn
+# (active plan, primary doctor). Only plain data is cached:
+# ORM rows (get_users) are bound to the session that loaded them and are never cached.
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "30"))
+QUERY_CACHE_SIZE = 2048
+_USER_KEYS = ("user_id", "patient_id", "doctor_user_id")
+# (method, args, sorted kwargs) -> (expires_at, result)
+_query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+# Tools query from worker threads
+_query_cache_lock = threading.Lock()
+
+def _ttl_cached(method):
+    """
+    Cache successful, non-empty results of a DatabaseManager lookup for QUERY_CACHE_TTL seconds.
+    Results must be plain data (dicts/lists/scalars); every caller gets its own copy.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not any(a is not None for a in args) and not any(v is not None for v in kwargs.values()):
+            return method(self, *args, **kwargs)  # unfiltered lookups are never cached
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:  # unhashable argument
+            return method(self, *args, **kwargs)
+        now = time.monotonic()
+        with _query_cache_lock:
+            hit = _query_cache.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    _query_cache.move_to_end(key)
+                    return copy.deepcopy(hit[1])
+                del _query_cache[key]
+        result = method(self, *args, **kwargs)
+        if result and not (isinstance(result, dict) and "error" in result):
+            with _query_cache_lock:
+                _query_cache[key] = (now + QUERY_CACHE_TTL, copy.deepcopy(result))
+                while len(_query_cache) > QUERY_CACHE_SIZE:
+                    _query_cache.popitem(last=False)
+        return result
+    return wrapper
+
+def invalidate_user_cache(user_id: Optional[int] = None):
+    """Drop cached lookups for one user (as user, patient or doctor), or everything when user_id is None."""
+    with _query_cache_lock:
+        if user_id is None:
+            _query_cache.clear()
+            return
+        for key in [k for k in _query_cache if user_id in k[1] or any(
+                field in _USER_KEYS and value == user_id for field, value in k[2])]:
+            del _query_cache[key]
+
+def _invalidate_flushed_users(session, flush_context):
+    """Session after_flush hook: forget cached lookups for every user touched by a write."""
+    user_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Users):
+            user_ids.add(obj.id)
+        for field in ("user_id", "patient_id", "doctor_user_id"):
+            value = getattr(obj, field, None)
+            if isinstance(value, int):
+                user_ids.add(value)
+    for user_id in user_ids:
+        invalidate_user_cache(user_id)
+
+def _sort_foodlog_result(result, kwargs: Dict[str, Any]):
+    """Enforce deterministic ordering of foodlog entries (list, or dict with 'entries')."""
+    try:
+        exact_date = kwargs.get("exact_date")
+        meal_type = kwargs.get("meal_type")
+        newest_first = bool(exact_date and meal_type)  # for a specific day+meal, pick the latest
+        if isinstance(result, list):
+            result = _stable_sort_food_entries(result, newest_first=newest_first)
+        elif isinstance(result, dict):
+            # Support both shapes: either a list directly or inside 'entries'
+            if isinstance(result.get("entries"), list):
+                result["entries"] = _stable_sort_food_entries(result["entries"], newest_first=newest_first)
+    except Exception as sort_err:
+        logger.warning(f"Foodlog stable sort skipped: {sort_err}")
+    return result
+
+def _delegate(service_attr: str, method_name: str, label: Optional[str] = None,
+              empty: Any = None, postprocess=None):
+    """
+    Build a DatabaseManager method forwarding **kwargs to getattr(self, service_attr).method_name.
+    With a label, failures return {"error": ...} dicts; otherwise a copy of `empty` is returned.
+    """
+    def fail(message: str):
+        return {"error": message} if label else copy.copy(empty)
+
+    def method(self, **kwargs):
+        if self._session() is None:
+            return fail("Database connection failed")
+
+        try:
+            service = getattr(self, service_attr)
+            if not service:
+                return fail(f"{label} service unavailable")
+            result = getattr(service, method_name)(**kwargs)
+            return postprocess(result, kwargs) if postprocess else result
+        except Exception as e:
+            self._handle_db_error(e)
+            return fail(f"Database error: {str(e)}")
+
+    method.__name__ = method.__qualname__ = method_name
+    method.__doc__ = f"Delegate to {service_attr.replace('_', ' ')}"
+    return method
+
 class DatabaseManager:
-    """Main database manager using service layer pattern"""
+    """
+    Main database manager using service layer pattern.
+
+    Each instance owns one session, opened on first use and closed by close() / the
+    with-block, so managers must not be shared between threads or tasks.
+    """
 
     def __init__(self, auto_init: bool = True):
-        self.db = None
-        self._medical_readings_service = None
-        self._medications_service = None
-        self._foodlog_service = None
-        self._protocol_service = None
-        self._plan_service = None
-        self._patient_doctor_mapping_service = None
-
-        if auto_init:
+        self._db: Optional[Session] = None
+
+        # Reuse the process-wide engine/pool; only bootstrap it on first use
+        if auto_init and not _INITIALIZED:
             try:
                 init_database()
             except Exception as e:
                 logger.warning(f"Database initialization failed: {e}")
 
-        self._get_session()
-
     def __enter__(self):
         """Context manager entry"""
         return self
@@ -174,272 +378,125 @@ class DatabaseManager:
         """Context manager exit - ensures cleanup"""
         self.close()
 
+    @property
+    def db(self) -> Optional[Session]:
+        """This manager's session (opened on first use), or None if the database is not initialized"""
+        if self._db is None and _INITIALIZED:
+            self._db = SessionLocal()
+        return self._db
+
     def close(self):
-        """Close database session"""
-        if self.db:
-            try:
-                self.db.close()
-                logger.debug("Database session closed")
-            except Exception as e:
-                logger.error(f"Error closing database session: {e}")
-            finally:
-                self.db = None
-                # Reset services
-                self._medical_readings_service = None
-                self._medications_service = None
-                self._foodlog_service = None
-                self._protocol_service = None
-                self._plan_service = None
-
-    def _get_session(self):
-        """Get a fresh database session"""
+        """Close this manager's database session; the next access opens a fresh one"""
+        if self._db is None:
+            return
         try:
-            if SessionLocal is None:
-                raise Exception("Database not initialized. Call init_database() first.")
-
-            # Close existing session if any
-            if self.db:
-                try:
-                    self.db.close()
-                except Exception:
-                    pass
-
-            # Create new session
-            self.db = SessionLocal()
-
-            # Reset services to use new session
-            self._medical_readings_service = None
-            self._medications_service = None
-            self._foodlog_service = None
-            self._protocol_service = None
-
+            self._db.close()
+            logger.debug("Database session closed")
         except Exception as e:
-            logger.error(f"Failed to create database session: {e}")
-            self.db = None
+            logger.error(f"Error closing database session: {e}")
+        finally:
+            self._db = None
+
+    def _session(self) -> Optional[Session]:
+        """This manager's session, or None (logged) when the database is not initialized"""
+        db = self.db
+        if db is None:
+            logger.error(f"Failed to create database session: {_NOT_INITIALIZED_MSG}")
+        return db
 
     def _handle_db_error(self, error):
         """Handle database errors by rolling back and creating new session"""
-        logger.error(f"Database error: {error}")
-        if self.db:
+        if isinstance(error, DBAPIError) and error.connection_invalidated:
+            # The pool already discarded the dead connection; the fresh session gets a new one
+            logger.warning(f"Database connection lost, reconnecting: {error}")
+        else:
+            logger.error(f"Database error: {error}")
+        if self._db is not None:
             try:
-                self.db.rollback()
-                self.db.close()
+                self._db.rollback()
             except Exception:
                 pass
-            # Create fresh session
-            self._get_session()
+            # The next access to self.db opens a fresh session
+            self.close()
+
+    def _service(self, name: str, service_cls):
+        """Service bound to this manager's session, built once per session (kept in session.info)"""
+        db = self.db
+        if db is None:
+            return None
+        service = db.info.get(name)
+        if service is None:
+            service = db.info[name] = service_cls(db)
+        return service
 
     # Service property accessors
     @property
     def medical_readings_service(self) -> Optional[MedicalReadingsService]:
         """Get medical readings service instance"""
-        if not self._medical_readings_service and self.db:
-            self._medical_readings_service = MedicalReadingsService(self.db)
-        return self._medical_readings_service
+        return self._service("medical_readings_service", MedicalReadingsService)
 
     @property
     def medications_service(self) -> Optional[MedicationsService]:
         """Get medications service instance"""
-        if not self._medications_service and self.db:
-            self._medications_service = MedicationsService(self.db)
-        return self._medications_service
+        return self._service("medications_service", MedicationsService)
 
     @property
     def foodlog_service(self) -> Optional[FoodlogService]:
         """Get foodlog service instance"""
-        if not self._foodlog_service and self.db:
-            self._foodlog_service = FoodlogService(self.db)
-        return self._foodlog_service
+        return self._service("foodlog_service", FoodlogService)
 
     @property
     def protocol_service(self) -> Optional[ProtocolService]:
         """Get protocol service instance"""
-        if not self._protocol_service and self.db:
-            self._protocol_service = ProtocolService(self.db)
-        return self._protocol_service
+        return self._service("protocol_service", ProtocolService)
 
     @property
     def plan_service(self) -> Optional[PlanService]:
         """Get plan service instance"""
-        if not self._plan_service and self.db:
-            self._plan_service = PlanService(self.db)
-        return self._plan_service
+        return self._service("plan_service", PlanService)
 
     @property
     def patient_doctor_mapping_service(self) -> Optional[PatientDoctorMappingService]:
         """Get patient doctor mapping service instance"""
-        if not self._patient_doctor_mapping_service and self.db:
-            self._patient_doctor_mapping_service = PatientDoctorMappingService(self.db)
-        return self._patient_doctor_mapping_service
+        return self._service("patient_doctor_mapping_service", PatientDoctorMappingService)
 
     # Delegate methods to services
-    def get_specific_reading_value(self, **kwargs) -> Dict[str, Any]:
-        """Delegate to medical readings service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.medical_readings_service
-            if not service:
-                return {"error": "Medical readings service unavailable"}
-            return service.get_specific_reading_value(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
-
-    def get_high_low_readings(self, **kwargs) -> Dict[str, Any]:
-        """Delegate to medical readings service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.medical_readings_service
-            if not service:
-                return {"error": "Medical readings service unavailable"}
-            return service.get_high_low_readings(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
-
-    def get_medications(self, **kwargs) -> Dict[str, Any]:
-        """Delegate to medications service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.medications_service
-            if not service:
-                return {"error": "Medications service unavailable"}
-            return service.get_medications(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
-
-    def get_foodlog(self, **kwargs) -> Dict[str, Any] | List[Dict[str, Any]]:
-        """
-        Delegate to foodlog service, then enforce deterministic ordering so the
-        agent's 'first item' selection is stable across restarts.
-        """
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.foodlog_service
-            if not service:
-                return {"error": "Foodlog service unavailable"}
-
-            result = service.get_foodlog(**kwargs)
-
-            # --- NEW: stable ordering for deterministic answers ---
-            try:
-                exact_date = kwargs.get("exact_date")
-                meal_type = kwargs.get("meal_type")
-                newest_first = bool(exact_date and meal_type)  # for a specific day+meal, pick the latest
-                if isinstance(result, list):
-                    result = _stable_sort_food_entries(result, newest_first=newest_first)
-                elif isinstance(result, dict):
-                    # Support both shapes: either a list directly or inside 'entries'
-                    if isinstance(result.get("entries"), list):
-                        result["entries"] = _stable_sort_food_entries(result["entries"], newest_first=newest_first)
-            except Exception as sort_err:
-                logger.warning(f"Foodlog stable sort skipped: {sort_err}")
-            # --- END NEW ---
-
-            return result
-
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
-
-    def get_protocols(self, **kwargs) -> Dict[str, Any]:
-        """Delegate to protocol service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.protocol_service
-            if not service:
-                return {"error": "Protocol service unavailable"}
-            return service.get_protocols(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
-
-    def get_user_plans(self, **kwargs) -> List[Dict[str, Any]]:
-        """Delegate to plan service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return []
-
-        try:
-            service = self.plan_service
-            if not service:
-                return []
-            return service.get_user_plans(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return []
-
-    def get_current_active_plan(self, **kwargs) -> Optional[Dict[str, Any]]:
-        """Delegate to plan service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return None
-
-        try:
-            service = self.plan_service
-            if not service:
-                return None
-            return service.get_current_active_plan(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return None
-
-    def get_plan_usage_summary(self, **kwargs) -> Dict[str, Any]:
-        """Delegate to plan service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return {"error": "Database connection failed"}
-
-        try:
-            service = self.plan_service
-            if not service:
-                return {"error": "Plan service unavailable"}
-            return service.get_plan_usage_summary(**kwargs)
-        except Exception as e:
-            self._handle_db_error(e)
-            return {"error": f"Database error: {str(e)}"}
+    get_specific_reading_value = _delegate("medical_readings_service", "get_specific_reading_value", label="Medical readings")
+    get_high_low_readings = _delegate("medical_readings_service", "get_high_low_readings", label="Medical readings")
+    get_medications = _delegate("medications_service", "get_medications", label="Medications")
+    # Stable ordering keeps the agent's 'first item' selection deterministic across restarts
+    get_foodlog = _delegate("foodlog_service", "get_foodlog", label="Foodlog", postprocess=_sort_foodlog_result)
+    get_protocols = _delegate("protocol_service", "get_protocols", label="Protocol")
+    get_user_plans = _delegate("plan_service", "get_user_plans", empty=[])
+    get_current_active_plan = _ttl_cached(_delegate("plan_service", "get_current_active_plan", empty=None))
+    get_plan_usage_summary = _delegate("plan_service", "get_plan_usage_summary", label="Plan")
 
     def get_users(self, user_id: Optional[int] = None, mobile_number: Optional[str] = None, email: Optional[str] = None) -> List:
         """Get users with filters"""
-        if not self.db:
-            self._get_session()
+        if email is not None:
+            email = email.strip()
+            if not email:
+                # A blank email would turn into a match-everything prefix filter
+                return []
 
-        if not self.db:
+        db = self._session()
+        if db is None:
             return []
 
         try:
-            query = self.db.query(Users)
+            query = db.query(Users)
 
             if user_id:
                 query = query.filter(Users.id == user_id)
             if mobile_number:
                 query = query.filter(Users.mobile_number == mobile_number)
             if email:
-                query = query.filter(Users.email.ilike(f"%{email}%"))
+                # MySQL's default *_ci collation already compares case-insensitively, so a plain
+                # equality / prefix LIKE can seek the users.email index (ILIKE wraps it in LOWER())
+                if "@" in email:
+                    query = query.filter(Users.email == email)
+                else:
+                    query = query.filter(Users.email.startswith(email, autoescape=True))
 
             result = query.all()
             return result
@@ -448,71 +505,39 @@ class DatabaseManager:
             self._handle_db_error(e)
             return []
 
-    # Patient Doctor Mapping delegate methods
-    def get_patient_doctors(self, **kwargs) -> List[Dict[str, Any]]:
-        """Delegate to patient doctor mapping service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
+    def get_patients(self, role_id: int = 1) -> List[Dict[str, Any]]:
+        """Get id and name of every user with the patient role"""
+        db = self._session()
+        if db is None:
             return []
 
         try:
-            service = self.patient_doctor_mapping_service
-            if service:
-                return service.get_patient_doctors(**kwargs)
-            return []
-        except Exception as e:
-            self._handle_db_error(e)
-            return []
+            rows = (
+                db.query(Users.id, Users.first_name, Users.last_name)
+                .filter(Users.role_id == role_id)
+                .order_by(Users.first_name, Users.last_name)
+                .all()
+            )
+            return [
+                {"id": uid, "name": f"{first or ''} {last or ''}".strip()}
+                for uid, first, last in rows
+            ]
 
-    def get_doctor_patients(self, **kwargs) -> List[Dict[str, Any]]:
-        """Delegate to patient doctor mapping service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return []
-
-        try:
-            service = self.patient_doctor_mapping_service
-            if service:
-                return service.get_doctor_patients(**kwargs)
-            return []
         except Exception as e:
             self._handle_db_error(e)
             return []
 
-    def get_primary_doctor(self, **kwargs) -> Optional[Dict[str, Any]]:
-        """Delegate to patient doctor mapping service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return None
-
-        try:
-            service = self.patient_doctor_mapping_service
-            if service:
-                return service.get_primary_doctor(**kwargs)
-            return None
-        except Exception as e:
-            self._handle_db_error(e)
-            return None
-
-    def check_doctor_patient_access(self, **kwargs) -> bool:
-        """Delegate to patient doctor mapping service"""
-        if not self.db:
-            self._get_session()
-        if not self.db:
-            return False
+    # Patient Doctor Mapping delegate methods
+    get_patient_doctors = _delegate("patient_doctor_mapping_service", "get_patient_doctors", empty=[])
+    get_doctor_patients = _delegate("patient_doctor_mapping_service", "get_doctor_patients", empty=[])
+    get_primary_doctor = _ttl_cached(_delegate("patient_doctor_mapping_service", "get_primary_doctor", empty=None))
+    # Authorization check: never cached, so a removed mapping takes effect immediately
+    check_doctor_patient_access = _delegate("patient_doctor_mapping_service", "check_doctor_patient_access", empty=False)
 
-        try:
-            service = self.patient_doctor_mapping_service
-            if service:
-                return service.check_doctor_patient_access(**kwargs)
-            return False
-        except Exception as e:
-            self._handle_db_error(e)
-            return False
+    def invalidate_user(self, user_id: int):
+        """Forget cached lookups for a user; call after writing user, plan or mapping rows"""
+        invalidate_user_cache(user_id)
 
 def get_db_manager() -> DatabaseManager:
-    """Get a DatabaseManager instance with connection handling"""
+    """Get a new DatabaseManager; use it as a context manager so its session is closed"""
     return DatabaseManager(auto_init=True)
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, Float, String, Date
+from sqlalchemy import Column, Integer, Float, String, Date, Index
 
 from .base import Base
 
 class ActivityReadings(Base):
     __tablename__ = "activity_readings"
-    id = Column(Integer, primary_key=True, index=True)
+    # Readings are fetched per patient over a time range
+    __table_args__ = (Index("ix_activity_readings_patient_date", "patient_id", "date"),)
+    id = Column(Integer, primary_key=True)
     total_exercise_duration = Column(Float, nullable=True)
     total_calories_burned = Column(Float, nullable=True)
     patient_id = Column(Integer, nullable=True)
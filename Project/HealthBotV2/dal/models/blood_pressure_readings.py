@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy import Column, Integer, DateTime, Index
 
 from .base import Base
 
 class BloodPressureReadings(Base):
     __tablename__ = "blood_pressure_readings"
-    id = Column(Integer, primary_key=True, index=True)
+    # Readings are fetched per patient over a time range
+    __table_args__ = (Index("ix_blood_pressure_readings_patient_timestamp", "patient_id", "timestamp"),)
+    id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=True)
     systolic = Column(Integer, nullable=True)
     diastolic = Column(Integer, nullable=True)
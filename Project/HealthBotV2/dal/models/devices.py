@@ -8,6 +8,9 @@ from sqlalchemy import Column, Integer, String, DateTime, SmallInteger
 from datetime import datetime, timedelta
 from .base import Base
 
+# CGM sensors expire this many days after their session starts
+CGM_SESSION_DAYS = 15
+
 class Devices(Base):
     """Devices table model for CGM and other medical devices"""
     __tablename__ = 'devices'
@@ -41,39 +44,43 @@ class Devices(Base):
         """Check if the device is currently active"""
         return self.status == 1
     
+    def _cgm_expiry(self):
+        """CGM expiry (session_start_date + 15 days), or None; memoized until name/start date change"""
+        key = (self.name, self.session_start_date)
+        cached = self.__dict__.get('_expiry_cache')
+        if cached is None or cached[0] != key:
+            expiry = None
+            # For CGM devices, they expire 15 days after session start; other devices don't expire
+            if self.session_start_date and self.name and 'cgm' in self.name.lower():
+                expiry = self.session_start_date + timedelta(days=CGM_SESSION_DAYS)
+            cached = (key, expiry)
+            self.__dict__['_expiry_cache'] = cached
+        return cached[1]
+    
+    def expiry_status(self, now=None):
+        """(is_expired, expiry_date, days_until_expiry) against a single clock reading"""
+        now = now or datetime.now()
+        expiry = self._cgm_expiry()
+        if not self.session_start_date or not self.is_active:
+            is_expired = True
+        else:
+            is_expired = expiry is not None and expiry < now
+        if expiry is None:
+            return is_expired, None, None
+        days = (expiry - now).days
+        return is_expired, expiry, days if days >= 0 else 0  # 0 if already expired
+    
     @property 
     def is_expired(self):
         """Check if the device session has expired (for CGM: session_start_date + 15 days < today)"""
-        if not self.session_start_date or not self.is_active:
-            return True
-            
-        # For CGM devices, they expire 15 days after session start
-        if self.name and 'cgm' in self.name.lower():
-            expiry_date = self.session_start_date + timedelta(days=15)
-            return expiry_date < datetime.now()
-        
-        # For other devices, assume they don't expire unless specified
-        return False
+        return self.expiry_status()[0]
     
     @property
     def expiry_date(self):
         """Get the expiry date for the device"""
-        if not self.session_start_date:
-            return None
-            
-        # For CGM devices, they expire 15 days after session start
-        if self.name and 'cgm' in self.name.lower():
-            return self.session_start_date + timedelta(days=15)
-        
-        # For other devices, no expiry date
-        return None
+        return self._cgm_expiry()
     
     @property
     def days_until_expiry(self):
         """Get number of days until device expires"""
-        expiry = self.expiry_date
-        if not expiry:
-            return None
-            
-        delta = expiry - datetime.now()
-        return delta.days if delta.days >= 0 else 0  # Return 0 if already expired
+        return self.expiry_status()[2]
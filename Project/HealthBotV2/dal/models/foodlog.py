@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from .base import Base
 
 class Foodlog(Base):
     __tablename__ = "foodlog"
-    id = Column(Integer, primary_key=True, index=True)
+    # Entries are fetched per patient, newest first
+    __table_args__ = (Index("ix_foodlog_patient_createdon", "patient_id", "createdon"),)
+    id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, nullable=False)
     type = Column(String(50), nullable=True)
     url = Column(String(500), nullable=True)
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy import Column, Integer, Float, DateTime, Index
 
 from .base import Base
 
 class GlucoseReadings(Base):
     __tablename__ = "glucose_readings"
-    id = Column(Integer, primary_key=True, index=True)
+    # Readings are fetched per patient over a time range
+    __table_args__ = (Index("ix_glucose_readings_patient_timestamp", "patient_id", "timestamp"),)
+    id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=True)
     value = Column(Float, nullable=True)
     patient_id = Column(Integer, nullable=True)
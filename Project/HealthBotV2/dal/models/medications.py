@@ -4,8 +4,8 @@ from .base import Base
 
 class Medications(Base):
     __tablename__ = "medications"
-    id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, nullable=True)
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, nullable=True, index=True)
     medication_type = Column(String(255), nullable=True)
     medication_name = Column(String(500), nullable=True)
     dosage = Column(String(255), nullable=True)
@@ -4,7 +4,7 @@ from .base import Base
 
 class Role(Base):
     __tablename__ = "role"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
     
     # Role mapping based on your database
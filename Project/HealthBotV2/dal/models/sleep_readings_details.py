@@ -1,12 +1,14 @@
 
 
-from sqlalchemy import Column, Integer, Float, DateTime, String
+from sqlalchemy import Column, Integer, Float, DateTime, String, Index
 
 from .base import Base
 
 class SleepReadingsDetails(Base):
     __tablename__ = "sleep_readings_details"
-    id = Column(Integer, primary_key=True, index=True)
+    # Readings are fetched per patient over a time range
+    __table_args__ = (Index("ix_sleep_readings_details_patient_date", "patient_id", "date"),)
+    id = Column(Integer, primary_key=True)
     sleep_type = Column(String, nullable=True)
     date = Column(DateTime, nullable=True)
     value = Column(Float, nullable=True)
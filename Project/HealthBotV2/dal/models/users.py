@@ -4,11 +4,11 @@ from .base import Base
 
 class Users(Base):
     __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     mobile_number = Column(String(255), nullable=True)
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
-    email = Column(String(255), nullable=True)
+    email = Column(String(255), nullable=True, index=True)
     state = Column(String(255), nullable=True)
     zipcode = Column(String(255), nullable=True)
     role_id = Column(Integer, nullable=False)
@@ -268,24 +268,31 @@ class MedicalReadingsService(BaseService):
                 "stress": {"high": 80, "low": 20}
             }
             
-            query = self.db.query(model, Users).join(Users, model.patient_id == Users.id)
+            value_col = getattr(model, self._get_value_field(reading_type))
+            timestamp_col = getattr(model, timestamp_field)
+            
+            # One query for every patient, selecting only the columns the grouping needs
+            # (no ORM entity hydration for what can be thousands of rows)
+            columns = [Users.id, Users.first_name, Users.last_name, timestamp_col, value_col]
+            if reading_type == "blood_pressure":
+                columns.append(model.diastolic)
+            query = self.db.query(*columns).select_from(model).join(Users, model.patient_id == Users.id)
             
             if date_filter:
                 query = query.filter(
-                    getattr(model, timestamp_field) >= date_filter,
-                    getattr(model, timestamp_field) < date_filter + timedelta(days=1)
+                    timestamp_col >= date_filter,
+                    timestamp_col < date_filter + timedelta(days=1)
                 )
             
             if find_type in ["high", "low"]:
                 threshold = thresholds[reading_type][find_type]
-                value_field = self._get_value_field(reading_type)
                 
                 if find_type == "high":
-                    query = query.filter(getattr(model, value_field) > threshold)
+                    query = query.filter(value_col > threshold)
                 else:
-                    query = query.filter(getattr(model, value_field) < threshold)
+                    query = query.filter(value_col < threshold)
             
-            results = query.order_by(getattr(model, timestamp_field).desc()).all()
+            results = query.order_by(timestamp_col.desc()).all()
             
             # Group by patient
             distinct_patients = self._group_readings_by_patient(results, reading_type, find_type)
@@ -315,24 +322,21 @@ class MedicalReadingsService(BaseService):
             return "value"
     
     def _group_readings_by_patient(self, results: List, reading_type: str, find_type: str) -> List[Dict]:
-        """Group readings by patient for distinct patient analysis"""
+        """Group (patient_id, first_name, last_name, timestamp, value[, diastolic]) rows by patient"""
         patient_groups = {}
+        is_bp = reading_type == "blood_pressure"
         
-        for reading, user in results:
-            patient_id = user.id
-            patient_name = f"{user.first_name} {user.last_name}"
-            
-            value_field = self._get_value_field(reading_type)
-            value = getattr(reading, value_field)
+        for row in results:
+            patient_id, first_name, last_name, timestamp, value = row[:5]
             
             additional_info = {}
-            if reading_type == "blood_pressure":
-                additional_info = {"diastolic": reading.diastolic}
+            if is_bp:
+                additional_info = {"diastolic": row[5]}
             
             if patient_id not in patient_groups:
                 patient_groups[patient_id] = {
                     "patient_id": patient_id,
-                    "patient_name": patient_name,
+                    "patient_name": f"{first_name} {last_name}",
                     "reading_type": reading_type,
                     "readings": [],
                     "highest_value": value,
@@ -341,7 +345,7 @@ class MedicalReadingsService(BaseService):
                 }
             
             reading_dict = {
-                "timestamp": reading.timestamp.isoformat() if reading.timestamp else None,
+                "timestamp": timestamp.isoformat() if timestamp else None,
                 "value": value
             }
             reading_dict.update(additional_info)
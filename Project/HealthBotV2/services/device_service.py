@@ -11,12 +11,11 @@ from dal.models.devices import Devices
 from dal.models.users import Users
 from dal.database import DatabaseManager
 
+# Rows fetched per round-trip when streaming device lists
+DEVICE_BATCH_SIZE = 500
 
 class DeviceService:
-    """Service class for device-related operations"""
-    
-    def __init__(self, db_manager: DatabaseManager):
-        self.db_manager = db_manager
+    """Service class for device-related operations (each call opens and closes its own session)"""
     
     def _resolve_patient_name_to_id(self, session: Session, patient_name: str, role: str, user_id: int) -> Optional[int]:
         """
@@ -37,7 +36,7 @@ class DeviceService:
     def get_device_by_id(self, device_id: int, role: str, user_id: int) -> Optional[Dict[str, Any]]:
         """Get a device by ID with role-based access control"""
         try:
-            with self.db_manager as db_mgr:
+            with DatabaseManager() as db_mgr:
                 if not db_mgr.db:
                     return None
                     
@@ -51,9 +50,10 @@ class DeviceService:
                     return None
                 
                 device_dict = device.to_dict()
-                device_dict['is_expired'] = device.is_expired
-                device_dict['expiry_date'] = device.expiry_date.isoformat() if device.expiry_date else None
-                device_dict['days_until_expiry'] = device.days_until_expiry
+                is_expired, expiry_date, days_until_expiry = device.expiry_status()
+                device_dict['is_expired'] = is_expired
+                device_dict['expiry_date'] = expiry_date.isoformat() if expiry_date else None
+                device_dict['days_until_expiry'] = days_until_expiry
                 
                 return device_dict
         except Exception as e:
@@ -63,7 +63,7 @@ class DeviceService:
     def get_devices_for_patient(self, patient_id: int, role: str, user_id: int, device_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all devices for a patient with role-based access control"""
         try:
-            with self.db_manager as db_mgr:
+            with DatabaseManager() as db_mgr:
                 if not db_mgr.db:
                     return []
                     
@@ -80,9 +80,10 @@ class DeviceService:
                 results = []
                 for device in devices:
                     device_dict = device.to_dict()
-                    device_dict['is_expired'] = device.is_expired
-                    device_dict['expiry_date'] = device.expiry_date.isoformat() if device.expiry_date else None
-                    device_dict['days_until_expiry'] = device.days_until_expiry
+                    is_expired, expiry_date, days_until_expiry = device.expiry_status()
+                    device_dict['is_expired'] = is_expired
+                    device_dict['expiry_date'] = expiry_date.isoformat() if expiry_date else None
+                    device_dict['days_until_expiry'] = days_until_expiry
                     results.append(device_dict)
                 
                 return results
@@ -93,7 +94,7 @@ class DeviceService:
     def get_cgm_devices(self, patient_name: Optional[str], role: str, user_id: int) -> List[Dict[str, Any]]:
         """Get CGM devices with expiry information"""
         try:
-            with self.db_manager as db_mgr:
+            with DatabaseManager() as db_mgr:
                 if not db_mgr.db:
                     return []
                     
@@ -119,9 +120,10 @@ class DeviceService:
                 results = []
                 for device in devices:
                     device_dict = device.to_dict()
-                    device_dict['is_expired'] = device.is_expired
-                    device_dict['expiry_date'] = device.expiry_date.isoformat() if device.expiry_date else None
-                    device_dict['days_until_expiry'] = device.days_until_expiry
+                    is_expired, expiry_date, days_until_expiry = device.expiry_status()
+                    device_dict['is_expired'] = is_expired
+                    device_dict['expiry_date'] = expiry_date.isoformat() if expiry_date else None
+                    device_dict['days_until_expiry'] = days_until_expiry
                     
                     # Get patient name for display
                     patient = db_mgr.db.query(Users).filter_by(id=device.patient_id).first()
@@ -137,7 +139,7 @@ class DeviceService:
     def check_device_expiry(self, patient_name: Optional[str], device_name: str, role: str, user_id: int) -> Dict[str, Any]:
         """Check when a specific device expires"""
         try:
-            with self.db_manager as db_mgr:
+            with DatabaseManager() as db_mgr:
                 if not db_mgr.db:
                     return {
                         'success': False,
@@ -180,9 +182,7 @@ class DeviceService:
                     }
                 
                 # Get expiry information
-                expiry_date = device.expiry_date
-                days_until_expiry = device.days_until_expiry
-                is_expired = device.is_expired
+                is_expired, expiry_date, days_until_expiry = device.expiry_status()
                 
                 if is_expired:
                     if expiry_date:
@@ -250,27 +250,35 @@ class DeviceService:
     def get_all_devices_for_user(self, role: str, user_id: int) -> List[Dict[str, Any]]:
         """Get all devices visible to the user based on their role"""
         try:
-            with self.db_manager as db_mgr:
+            with DatabaseManager() as db_mgr:
                 if not db_mgr.db:
                     return []
                     
                 if role == 'patient':
                     # Patients see only their own devices
-                    devices = db_mgr.db.query(Devices).filter_by(patient_id=user_id).all()
+                    devices = db_mgr.db.query(Devices).filter_by(patient_id=user_id)
                 else:
                     # Doctors and staff see all devices
-                    devices = db_mgr.db.query(Devices).all()
+                    devices = db_mgr.db.query(Devices)
+                
+                # Patient names for display, in one query up front (the device stream below holds the connection)
+                owners = db_mgr.db.query(Users.id, Users.first_name, Users.last_name).filter(
+                    Users.id.in_(devices.with_entities(Devices.patient_id).distinct().scalar_subquery())
+                )
+                patient_names = {
+                    uid: f"{first or ''} {last or ''}".strip() or 'Unknown' for uid, first, last in owners
+                }
                 
+                # Stream devices in batches: each ORM instance is converted and released instead of
+                # keeping the whole table's worth of mapped objects (and their __dict__s) alive at once
                 results = []
-                for device in devices:
+                for device in devices.yield_per(DEVICE_BATCH_SIZE):
                     device_dict = device.to_dict()
-                    device_dict['is_expired'] = device.is_expired
-                    device_dict['expiry_date'] = device.expiry_date.isoformat() if device.expiry_date else None
-                    device_dict['days_until_expiry'] = device.days_until_expiry
-                    
-                    # Get patient name for display
-                    patient = db_mgr.db.query(Users).filter_by(id=device.patient_id).first()
-                    device_dict['patient_name'] = patient.name if patient else 'Unknown'
+                    is_expired, expiry_date, days_until_expiry = device.expiry_status()
+                    device_dict['is_expired'] = is_expired
+                    device_dict['expiry_date'] = expiry_date.isoformat() if expiry_date else None
+                    device_dict['days_until_expiry'] = days_until_expiry
+                    device_dict['patient_name'] = patient_names.get(device.patient_id, 'Unknown')
                     
                     results.append(device_dict)
                 
@@ -287,7 +295,5 @@ def get_device_service() -> DeviceService:
     """Get the global device service instance"""
     global device_service
     if device_service is None:
-        from dal.database import DatabaseManager
-        db_manager = DatabaseManager()
-        device_service = DeviceService(db_manager)
+        device_service = DeviceService()
     return device_service
@@ -0,0 +1,31 @@
+"""
+Document Training Worker for Revival Medical System
+arq worker that runs document training outside the API process
+
+Run with: arq services.training_worker.WorkerSettings
+(REDIS_URL must point at the same Redis the API enqueues to)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from arq.connections import RedisSettings
+
+from services import training_service
+
+logger = logging.getLogger(__name__)
+
+async def train_task(ctx: Dict[str, Any], folder_path: Optional[str] = None) -> Dict[str, Any]:
+    """Train one folder; the blocking PDF/embedding work runs in a thread"""
+    logger.info(f"📚 Worker training folder: {folder_path or training_service.documents_folder}")
+    return await asyncio.to_thread(training_service.train_documents, folder_path)
+
+class WorkerSettings:
+    """arq worker configuration"""
+    functions = [train_task]
+    redis_settings = RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    # Training a folder can take many minutes
+    job_timeout = 3600
+    max_jobs = 1
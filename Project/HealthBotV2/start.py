@@ -14,14 +14,37 @@ load_dotenv()
 # Import the FastAPI app
 from app import app
 
+# uvloop is not available on Windows; fall back to the stdlib event loop there
+try:
+    import uvloop  # noqa: F401
+    EVENT_LOOP = "uvloop"
+except ImportError:
+    EVENT_LOOP = "asyncio"
+
+# httptools is the C HTTP parser; h11 is the pure-Python fallback
+try:
+    import httptools  # noqa: F401
+    HTTP_PROTOCOL = "httptools"
+except ImportError:
+    HTTP_PROTOCOL = "h11"
+
 if __name__ == "__main__":
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", "8000"))
+    # Chat sessions and auth cache live in process memory, so keep one worker
+    # unless requests are pinned to a worker by the load balancer
+    workers = int(os.getenv("API_WORKERS", "1"))
+    reload = os.getenv("API_RELOAD", "false").lower() == "true" and workers == 1
+    access_log = os.getenv("API_ACCESS_LOG", "false").lower() == "true"
     
     uvicorn.run(
         "app:app",
         host=host,
         port=port,
-        reload=True,
+        reload=reload,
+        workers=workers,
+        loop=EVENT_LOOP,
+        http=HTTP_PROTOCOL,
+        access_log=access_log,
         log_level="info"
     )
\ No newline at end of file
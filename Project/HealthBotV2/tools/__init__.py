@@ -16,6 +16,7 @@ from .plan_tool import PlanTool
 from .doctor_patient_mapping_tool import DoctorPatientMappingTool
 from .user_profile_tool import UserProfileTool
 from .device_tool import DeviceTool
+from .patient_directory_tool import PatientDirectoryTool
 
 
 __all__ = [
@@ -30,5 +31,6 @@ __all__ = [
     'PlanTool',
     'DoctorPatientMappingTool',
     'UserProfileTool',
-    'DeviceTool'
+    'DeviceTool',
+    'PatientDirectoryTool'
 ]
@@ -5,16 +5,20 @@ Simple tool for checking device expiry and counting devices per patient
 """
 
 import logging
-import json
 from typing import Optional, Union
 from datetime import datetime, timedelta
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 from dal.database import DatabaseManager
 from dal.models.devices import Devices
 from dal.models.users import Users
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round-trip when listing a patient's devices
+DEVICE_BATCH_SIZE = 500
+
 class DeviceTool(BaseTool):
     """Tool for checking device expiry status and counting devices"""
     name: str = "check_device_status"
@@ -77,7 +81,7 @@ class DeviceTool(BaseTool):
             # Get user context for role-based access
             user_context = getattr(self, 'user_context', None)
             if not user_context:
-                return json.dumps({
+                return dumps_result({
                     "success": False,
                     "error": "User context not available"
                 })
@@ -87,7 +91,7 @@ class DeviceTool(BaseTool):
             
             with DatabaseManager() as db_manager:
                 if not db_manager.db:
-                    return json.dumps({
+                    return dumps_result({
                         "success": False,
                         "error": "Database connection not available"
                     })
@@ -95,14 +99,14 @@ class DeviceTool(BaseTool):
                 # Get patient ID
                 patient_id = self._get_patient_id(patient_identifier, db_manager.db)
                 if not patient_id:
-                    return json.dumps({
+                    return dumps_result({
                         "success": False,
                         "message": f"Patient '{patient_identifier}' not found"
                     })
                 
                 # Role-based access control
                 if role == 'patient' and patient_id != current_user_id:
-                    return json.dumps({
+                    return dumps_result({
                         "success": False,
                         "message": "You can only view your own device information"
                     })
@@ -117,16 +121,18 @@ class DeviceTool(BaseTool):
                     patient_name = f"Patient {patient_id}"
                 
                 if check_all_devices:
-                    # Get only active devices for the patient
+                    # Get only active devices for the patient, streamed in batches so
+                    # each ORM instance is converted and released as we go
                     devices = db_manager.db.query(Devices).filter(
                         Devices.patient_id == patient_id,
                         Devices.status == 1  # Only active devices
-                    ).all()
+                    )
                     
                     device_list = []
                     expired_count = 0
                     
-                    for device in devices:
+                    for device in devices.yield_per(DEVICE_BATCH_SIZE):
+                        is_expired, expiry_date, days_until_expiry = device.expiry_status()
                         device_info = {
                             "id": device.id,
                             "name": device.name,
@@ -134,24 +140,24 @@ class DeviceTool(BaseTool):
                             "status": "Active",  # All devices are active now
                             "mapped_date": device.mapped_date.isoformat() if device.mapped_date else None,
                             "session_start_date": device.session_start_date.isoformat() if device.session_start_date else None,
-                            "is_expired": device.is_expired,
-                            "expiry_date": device.expiry_date.isoformat() if device.expiry_date else None,
-                            "days_until_expiry": device.days_until_expiry
+                            "is_expired": is_expired,
+                            "expiry_date": expiry_date.isoformat() if expiry_date else None,
+                            "days_until_expiry": days_until_expiry
                         }
                         
                         device_list.append(device_info)
                         
-                        if device.is_expired:
+                        if is_expired:
                             expired_count += 1
                     
-                    return json.dumps({
+                    return dumps_result({
                         "success": True,
                         "patient_name": patient_name,
                         "patient_id": patient_id,
-                        "total_active_devices": len(devices),
+                        "total_active_devices": len(device_list),
                         "expired_devices": expired_count,
                         "devices": device_list
-                    }, indent=2)
+                    })
                 
                 else:
                     # Check specific device
@@ -162,15 +168,13 @@ class DeviceTool(BaseTool):
                     ).first()
                     
                     if not device:
-                        return json.dumps({
+                        return dumps_result({
                             "success": False,
                             "message": f"No active {device_name} device found for {patient_name}"
                         })
                     
                     # Calculate expiry information
-                    is_expired = device.is_expired
-                    expiry_date = device.expiry_date
-                    days_until_expiry = device.days_until_expiry
+                    is_expired, expiry_date, days_until_expiry = device.expiry_status()
                     
                     result = {
                         "success": True,
@@ -197,11 +201,11 @@ class DeviceTool(BaseTool):
                     else:
                         result["message"] = f"{patient_name}'s {device.name} is active but no expiry date available"
                     
-                    return json.dumps(result, indent=2)
+                    return dumps_result(result)
                     
         except Exception as e:
             logger.error(f"Error in DeviceTool._run: {e}")
-            return json.dumps({
+            return dumps_result({
                 "success": False,
                 "error": f"Error checking device status: {str(e)}"
             })
@@ -209,4 +213,4 @@ class DeviceTool(BaseTool):
     async def _arun(self, patient_identifier: str, device_name: str = "CGM", 
                     check_all_devices: bool = False) -> str:
         """Async version of the tool"""
-        return self._run(patient_identifier, device_name, check_all_devices)
+        return await run_blocking(self._run, patient_identifier, device_name, check_all_devices)
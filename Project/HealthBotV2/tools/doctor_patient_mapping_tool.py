@@ -4,9 +4,10 @@ Doctor Patient Mapping Tool for Revival Medical System
 """
 
 import logging
-import json
 from typing import Optional, Dict, Any
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 from dal.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
@@ -61,29 +62,29 @@ class DoctorPatientMappingTool(BaseTool):
                 
                 # Only allow patient-specific queries
                 if query_type not in ['my_doctor', 'my_dha']:
-                    return json.dumps({
+                    return dumps_result({
                         "error": "Access denied: Patients can only query 'my_doctor' or 'my_dha' information.",
                         "allowed_queries": ["my_doctor", "my_dha"]
-                    }, indent=2)
+                    })
             
             elif not user_context or user_context.get('role_id') != 1:  # Medical staff
                 # Medical staff can query any patient information
                 if query_type in ['my_doctor', 'my_dha']:
-                    return json.dumps({
+                    return dumps_result({
                         "error": "Invalid query type for medical staff. Use 'patient_primary_doctor', 'patient_dha', or 'doctor_patients'.",
                         "allowed_queries": ["patient_primary_doctor", "patient_dha", "doctor_patients"]
-                    }, indent=2)
+                    })
                 
                 # For staff queries, patient_id or doctor_id must be provided
                 if query_type in ['patient_primary_doctor', 'patient_dha'] and not patient_id:
-                    return json.dumps({
+                    return dumps_result({
                         "error": "patient_id is required for patient-specific queries"
-                    }, indent=2)
+                    })
                 
                 if query_type == 'doctor_patients' and not doctor_id and not doctor_name:
-                    return json.dumps({
+                    return dumps_result({
                         "error": "doctor_id or doctor_name is required for doctor patient queries"
-                    }, indent=2)
+                    })
             
             with DatabaseManager() as db_manager:
                 if query_type == "my_doctor" or query_type == "patient_primary_doctor":
@@ -119,11 +120,11 @@ class DoctorPatientMappingTool(BaseTool):
                         all_doctors = db_manager.get_patient_doctors(patient_id=patient_id)
                         
                         if not all_doctors:
-                            return json.dumps({
+                            return dumps_result({
                                 "message": f"No doctors assigned to patient {patient_id}",
                                 "patient_id": patient_id,
                                 "assigned_doctors": []
-                            }, indent=2)
+                            })
                         
                         result = {
                             "patient_id": patient_id,
@@ -132,19 +133,19 @@ class DoctorPatientMappingTool(BaseTool):
                             "total_doctors": len(all_doctors)
                         }
                     
-                    return json.dumps(result, indent=2)
+                    return dumps_result(result)
                 
                 elif query_type == "my_dha" or query_type == "patient_dha":
                     # Get all doctors (including DHA) for the patient
                     patient_doctors = db_manager.get_patient_doctors(patient_id=patient_id, active_only=True)
                     
                     if not patient_doctors:
-                        return json.dumps({
+                        return dumps_result({
                             "message": f"No doctors/DHA found for patient {patient_id}",
                             "patient_id": patient_id,
                             "doctors": [],
                             "dha_details": []
-                        }, indent=2)
+                        })
                     
                     # Get detailed information for each doctor
                     detailed_doctors = []
@@ -178,14 +179,14 @@ class DoctorPatientMappingTool(BaseTool):
                                 'dha' in doctor_info['qualification'].lower()):
                                 dha_details.append(doctor_info)
                     
-                    return json.dumps({
+                    return dumps_result({
                         "patient_id": patient_id,
                         "total_doctors": len(detailed_doctors),
                         "doctors": detailed_doctors,
                         "dha_details": dha_details,
                         "message": f"Found {len(detailed_doctors)} doctors for patient {patient_id}" + 
                                   (f", including {len(dha_details)} DHA personnel" if dha_details else "")
-                    }, indent=2)
+                    })
                 
                 elif query_type == "doctor_patients":
                     # Get patients assigned to a specific doctor
@@ -197,31 +198,31 @@ class DoctorPatientMappingTool(BaseTool):
                         matching_doctors = [d for d in doctors if doctor_name.lower() in d.name.lower()]
                         
                         if not matching_doctors:
-                            return json.dumps({
+                            return dumps_result({
                                 "error": f"No doctor found with name containing '{doctor_name}'",
                                 "suggestion": "Try using exact doctor name or doctor ID"
-                            }, indent=2)
+                            })
                         
                         if len(matching_doctors) > 1:
-                            return json.dumps({
+                            return dumps_result({
                                 "error": f"Multiple doctors found with name containing '{doctor_name}'",
                                 "matching_doctors": [{"id": d.id, "name": d.name, "email": d.email} for d in matching_doctors],
                                 "suggestion": "Please specify exact doctor ID or more specific name"
-                            }, indent=2)
+                            })
                         
                         target_doctor_id = matching_doctors[0].id
                     
                     if not target_doctor_id:
-                        return json.dumps({
+                        return dumps_result({
                             "error": "Could not determine doctor ID"
-                        }, indent=2)
+                        })
                     
                     # Get doctor details
                     doctor_users = db_manager.get_users(user_id=target_doctor_id)
                     if not doctor_users:
-                        return json.dumps({
+                        return dumps_result({
                             "error": f"Doctor with ID {target_doctor_id} not found"
-                        }, indent=2)
+                        })
                     
                     doctor_info = doctor_users[0]
                     
@@ -245,7 +246,7 @@ class DoctorPatientMappingTool(BaseTool):
                             }
                             detailed_patients.append(patient_info)
                     
-                    return json.dumps({
+                    return dumps_result({
                         "doctor": {
                             "doctor_id": target_doctor_id,
                             "doctor_name": doctor_info.name,
@@ -257,22 +258,22 @@ class DoctorPatientMappingTool(BaseTool):
                         "total_patients": len(detailed_patients),
                         "patients": detailed_patients,
                         "message": f"Doctor {doctor_info.name} has {len(detailed_patients)} assigned patients"
-                    }, indent=2)
+                    })
                 
                 else:
-                    return json.dumps({
+                    return dumps_result({
                         "error": f"Invalid query_type: {query_type}",
                         "valid_types": ["my_doctor", "my_dha", "patient_primary_doctor", "patient_dha", "doctor_patients"]
-                    }, indent=2)
+                    })
         
         except Exception as e:
             logger.error(f"Error in DoctorPatientMappingTool: {e}")
-            return json.dumps({
+            return dumps_result({
                 "error": f"Database error: {str(e)}",
                 "query_type": query_type
-            }, indent=2)
+            })
     
     async def _arun(self, query_type: str, patient_id: Optional[int] = None, 
                     doctor_id: Optional[int] = None, doctor_name: Optional[str] = None) -> str:
         """Async version of the run method"""
-        return self._run(query_type, patient_id, doctor_id, doctor_name)
+        return await run_blocking(self._run, query_type, patient_id, doctor_id, doctor_name)
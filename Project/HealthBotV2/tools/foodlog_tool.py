@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
 from dal.database import get_db_manager
 from datetime import datetime
 
@@ -11,6 +12,8 @@ class FoodlogTool(BaseTool):
     name: str = "get_foodlog"
     description: str = (
         "Get food log entries for a patient. "
+        "Use for any meal question, including meal-on-date questions "
+        "(e.g., \"Rayudu's breakfast on 13 March 2025\"); answer with this tool's result only. "
         "Params: patient_identifier (id or name), date_filter (YYYY-MM-DD), "
         "exact_date (YYYY-MM-DD or natural-language), meal_type (e.g., 'breakfast'), limit (int). "
         "When exact_date and meal_type are provided, return a single concise sentence (text only)."
@@ -93,14 +96,14 @@ class FoodlogTool(BaseTool):
         patient_identifier = self._resolve_patient_identifier(patient_identifier)
         exact_date = self._normalize_exact_date(exact_date)
 
-        db_manager = get_db_manager()
-        entries = db_manager.get_foodlog(
-            patient_identifier=patient_identifier,
-            date_filter=date_filter,
-            limit=limit,
-            meal_type=meal_type,
-            exact_date=exact_date,
-        )
+        with get_db_manager() as db_manager:
+            entries = db_manager.get_foodlog(
+                patient_identifier=patient_identifier,
+                date_filter=date_filter,
+                limit=limit,
+                meal_type=meal_type,
+                exact_date=exact_date,
+            )
 
         if not entries or (isinstance(entries, dict) and entries.get("error")):
             return "No food log entries found."
@@ -121,7 +124,8 @@ class FoodlogTool(BaseTool):
         meal_type: Optional[str] = None,
         exact_date: Optional[str] = None,
     ) -> str:
-        return self._run(
+        return await run_blocking(
+            self._run,
             patient_identifier=patient_identifier,
             date_filter=date_filter,
             limit=limit,
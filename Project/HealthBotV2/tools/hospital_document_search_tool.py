@@ -6,6 +6,7 @@ Tool for searching hospital documents, handbooks, and medical documentation
 import logging
 from typing import Dict, Any, List, Optional
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
 from pydantic import BaseModel, Field
 
 # Import utilities from lib folder
@@ -118,7 +119,7 @@ class HospitalDocumentSearchTool(BaseTool):
     
     async def _arun(self, query: str, document_type: Optional[str] = None, max_results: int = 5) -> Dict[str, Any]:
         """Async version of hospital document search"""
-        return self._run(query, document_type, max_results)
+        return await run_blocking(self._run, query, document_type, max_results)
 
 # Function to help with document indexing (for future use)
 def index_hospital_document(document_text: str, document_id: str, metadata: Dict[str, Any]) -> bool:
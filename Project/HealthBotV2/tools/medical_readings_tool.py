@@ -5,10 +5,11 @@ Basic tool for getting comprehensive medical readings for a patient
 """
 
 import logging
-import json
 from typing import Optional
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 
 # Import our medical system components
 from dal.database import DatabaseManager
@@ -64,8 +65,13 @@ class MedicalReadingsTool(BaseTool):
                     end_date=end_datetime
                 )
             
-            return json.dumps(result, indent=2)
+            return dumps_result(result)
             
         except Exception as e:
             logger.error(f"Error in MedicalReadingsTool: {e}")
             return f"Error getting medical readings: {str(e)}"
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, patient_id, patient_name, start_date, end_date)
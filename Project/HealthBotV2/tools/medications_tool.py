@@ -4,10 +4,11 @@ Medications Tool for Revival Medical System
 """
 
 import logging
-import json
 from typing import Optional
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 from dal.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
@@ -65,9 +66,9 @@ class MedicationsTool(BaseTool):
                 try:
                     parsed_date = datetime.strptime(date_filter, "%Y-%m-%d")
                 except ValueError:
-                    return json.dumps({
+                    return dumps_result({
                         "error": f"Invalid date format. Use YYYY-MM-DD format. Got: {date_filter}"
-                    }, indent=2)
+                    })
             
             with DatabaseManager() as db_manager:
                 result = db_manager.get_medications(
@@ -78,7 +79,7 @@ class MedicationsTool(BaseTool):
                 )
                 
                 if "error" in result:
-                    return json.dumps(result, indent=2)
+                    return dumps_result(result)
                 
                 # Filter by medication type if specified
                 if medication_type:
@@ -104,10 +105,17 @@ class MedicationsTool(BaseTool):
                     if len(filtered_medications) == 0:
                         result["message"] = f"No {filter_type}s found for this patient"
                 
-                return json.dumps(result, indent=2)
+                return dumps_result(result)
                 
         except Exception as e:
             logger.error(f"Error in MedicationsTool: {e}")
-            return json.dumps({
+            return dumps_result({
                 "error": f"Error retrieving medications: {str(e)}"
-            }, indent=2)
+            })
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                    medication_type: Optional[str] = None, date_filter: Optional[str] = None,
+                    limit: int = 10) -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, patient_id, patient_name,
+                                  medication_type, date_filter, limit)
@@ -5,10 +5,11 @@ Tool for analyzing readings across multiple patients with optional dates
 """
 
 import logging
-import json
 from typing import Optional
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 
 # Import our medical system components
 from dal.database import DatabaseManager
@@ -62,8 +63,13 @@ class MultiPatientAnalysisTool(BaseTool):
                 if "error" in result:
                     return f"Error: {result['error']}"
                 
-                return json.dumps(result, indent=2)
+                return dumps_result(result)
                 
         except Exception as e:
             logger.error(f"Error in MultiPatientAnalysisTool: {e}")
             return f"Error analyzing multiple patients: {str(e)}"
+    
+    async def _arun(self, reading_type: str = "glucose", date_filter: Optional[str] = None,
+                    analysis_type: str = "high") -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, reading_type, date_filter, analysis_type)
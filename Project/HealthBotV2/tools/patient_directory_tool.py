@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Patient Directory Tool for Revival Medical System
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
+from dal.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+PATIENT_ROLE_ID = 1
+ROSTER_TTL_SECONDS = 300
+
+# (fetched_at, roster) shared by every tool instance
+_roster_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+
+
+def _load_roster() -> List[Dict[str, Any]]:
+    """Patient roster, re-read from the database at most every ROSTER_TTL_SECONDS"""
+    global _roster_cache
+    now = time.monotonic()
+    if _roster_cache is not None and now - _roster_cache[0] < ROSTER_TTL_SECONDS:
+        return _roster_cache[1]
+    with DatabaseManager() as db_manager:
+        roster = db_manager.get_patients(role_id=PATIENT_ROLE_ID)
+    if roster:
+        _roster_cache = (now, roster)
+    return roster
+
+
+class PatientDirectoryTool(BaseTool):
+    """Tool for listing the patients known to the system (medical staff only)"""
+    name: str = "list_known_patients"
+    description: str = """List the patients registered in the system with their patient IDs. Medical staff only.
+
+    Parameters:
+    - name_filter (str): Optional part of a patient name to narrow the list
+
+    Use this tool when:
+    - You need a patient's ID but only have their name
+    - The user asks "Which patients do we have?" / "List all patients"
+    - A patient name in the question is ambiguous or misspelled
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    def set_user_context(self, user_context):
+        """Set user context for role-based access control"""
+        object.__setattr__(self, 'user_context', user_context)
+
+    def _run(self, name_filter: Optional[str] = None) -> str:
+        """List known patients with role-based access control"""
+        user_context = getattr(self, 'user_context', None)
+        if not user_context:
+            return dumps_result({"error": "User context not available"})
+        # Only roles cleared for every patient's data (doctors, coaches, admins...) see the roster
+        if not user_context.get('can_access_all_patients'):
+            return dumps_result({"error": "Access denied: the patient directory is available to medical staff only."})
+
+        try:
+            patients = _load_roster()
+            if name_filter:
+                needle = name_filter.strip().lower()
+                patients = [p for p in patients if needle in p["name"].lower()]
+            return dumps_result({
+                "patients": patients,
+                "total_patients": len(patients),
+            })
+        except Exception as e:
+            logger.error(f"Error in PatientDirectoryTool: {e}")
+            return dumps_result({"error": f"Failed to list patients: {str(e)}"})
+
+    async def _arun(self, name_filter: Optional[str] = None) -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, name_filter)
@@ -4,10 +4,11 @@ Plan Tool for Revival Medical System
 """
 
 import logging
-import json
 from typing import Optional, Dict, Any
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 from dal.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
@@ -60,9 +61,9 @@ class PlanTool(BaseTool):
                 logger.info(f"Patient access: restricting plan query to patient ID {patient_id}")
             elif patient_id is None and patient_name is None:
                 # For medical staff, if no patient specified, this might be an error
-                return json.dumps({
+                return dumps_result({
                     "error": "Please specify a patient ID or patient name for the plan query."
-                }, indent=2)
+                })
             
             with DatabaseManager() as db_manager:
                 if plan_type == "summary":
@@ -70,31 +71,31 @@ class PlanTool(BaseTool):
                     result = db_manager.get_plan_usage_summary(patient_id=patient_id, patient_name=patient_name)
                     
                     if not result.get('has_active_plan'):
-                        return json.dumps({
+                        return dumps_result({
                             "message": "No active plan found for this patient",
                             "has_active_plan": False
-                        }, indent=2)
+                        })
                     
-                    return json.dumps({
+                    return dumps_result({
                         "plan_summary": result,
                         "message": f"Plan usage summary for {result['plan_name']}"
-                    }, indent=2)
+                    })
                 
                 elif plan_type == "all":
                     # Get all plans (active and inactive)
                     plans = db_manager.get_user_plans(patient_id=patient_id, patient_name=patient_name, active_only=False)
                     
                     if not plans:
-                        return json.dumps({
+                        return dumps_result({
                             "message": "No plans found for this patient",
                             "plans": []
-                        }, indent=2)
+                        })
                     
-                    return json.dumps({
+                    return dumps_result({
                         "plans": plans,
                         "total_plans": len(plans),
                         "message": f"Found {len(plans)} plans for patient"
-                    }, indent=2)
+                    })
                 
                 else:  # plan_type == "current" or default
                     # Get current active plan
@@ -105,28 +106,33 @@ class PlanTool(BaseTool):
                         all_plans = db_manager.get_user_plans(patient_id=patient_id, patient_name=patient_name, active_only=False)
                         if all_plans:
                             most_recent = all_plans[0]  # Already sorted by purchase date desc
-                            return json.dumps({
+                            return dumps_result({
                                 "message": "No currently active plan found. Showing most recent plan:",
                                 "plan": most_recent,
                                 "status": "inactive"
-                            }, indent=2)
+                            })
                         else:
-                            return json.dumps({
+                            return dumps_result({
                                 "message": "No plans found for this patient",
                                 "has_plan": False
-                            }, indent=2)
+                            })
                     
                     # Get usage summary for the current plan
                     usage_summary = db_manager.get_plan_usage_summary(patient_id=patient_id, patient_name=patient_name)
                     
-                    return json.dumps({
+                    return dumps_result({
                         "current_plan": current_plan,
                         "usage_summary": usage_summary,
                         "message": f"Current active plan: {current_plan['plan_name']}"
-                    }, indent=2)
+                    })
             
         except Exception as e:
             logger.error(f"Error in PlanTool: {e}")
-            return json.dumps({
+            return dumps_result({
                 "error": f"Failed to retrieve plan information: {str(e)}"
-            }, indent=2)
+            })
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                    plan_type: str = "current") -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, patient_id, patient_name, plan_type)
@@ -1,6 +1,7 @@
 from typing import Optional, Dict, Any
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
 from dal.database import DatabaseManager
 
 class ProtocolTool(BaseTool):
@@ -59,3 +60,9 @@ class ProtocolTool(BaseTool):
                 date_filter=date_obj,
                 limit=limit
         )
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                   date_filter: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, patient_id, patient_name,
+                                  date_filter, limit)
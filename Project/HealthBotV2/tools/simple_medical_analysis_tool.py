@@ -5,9 +5,9 @@ Simplified tool for basic medical analysis that works with existing database
 """
 
 import logging
-import json
 from typing import Optional
 from langchain.tools import BaseTool
+from tools.tool_json import dumps_result
 
 logger = logging.getLogger(__name__)
 
@@ -45,11 +45,11 @@ class SimpleMedicalAnalysisTool(BaseTool):
                 patient_name = None  # Override any patient_name to enforce access control
             elif patient_id is None and patient_name is None:
                 # For medical staff, if no patient specified, this might be an error
-                return json.dumps({
+                return dumps_result({
                     "error": "Please specify a patient ID or patient name for the medical analysis."
-                }, indent=2)
+                })
             
-            return json.dumps({
+            return dumps_result({
                 "message": f"The {analysis_request} analysis feature is not yet implemented in the database.",
                 "available_features": [
                     "glucose readings",
@@ -62,8 +62,13 @@ class SimpleMedicalAnalysisTool(BaseTool):
                 ],
                 "suggestion": f"Try asking for '{analysis_request}' readings using the general medical readings tool instead.",
                 "patient_access": f"Query restricted to patient ID: {patient_id}" if user_context and user_context.get('role_id') == 1 else "Full access"
-            }, indent=2)
+            })
             
         except Exception as e:
             logger.error(f"Error in SimpleMedicalAnalysisTool: {e}")
             return f"Error in basic medical analysis: {str(e)}"
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                    analysis_request: str = "medications") -> str:
+        """Async version of the run method; no I/O, so it runs inline"""
+        return self._run(patient_id, patient_name, analysis_request)
@@ -5,10 +5,11 @@ Tool for getting specific medical values with time/date filters
 """
 
 import logging
-import json
 from typing import Optional
 from datetime import datetime
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 
 # Import our medical system components
 from dal.database import DatabaseManager
@@ -123,7 +124,7 @@ class SpecificMedicalValueTool(BaseTool):
                 # Special handling for sleep data - return aggregated results directly
                 if reading_type == "sleep":
                     if "total_sleep_hours" in result:
-                        return json.dumps({
+                        return dumps_result({
                             "reading_type": "sleep",
                             "patient_id": result["patient_id"],
                             "date_filter": result.get("date_filter"),
@@ -133,14 +134,14 @@ class SpecificMedicalValueTool(BaseTool):
                             "sleep_breakdown": result.get("sleep_breakdown", {}),
                             "summary": result.get("summary", "No sleep data available"),
                             "individual_readings": result.get("individual_readings", [])
-                        }, indent=2)
+                        })
                     else:
-                        return json.dumps({
+                        return dumps_result({
                             "reading_type": "sleep",
                             "patient_id": result["patient_id"],
                             "message": "No sleep data found for the specified criteria",
                             "readings": result.get("readings", [])
-                        }, indent=2)
+                        })
                 
                 # Analyze the readings based on analysis_type for non-sleep data
                 readings = result.get("readings", [])
@@ -157,7 +158,7 @@ class SpecificMedicalValueTool(BaseTool):
                     sorted_readings = sorted(readings, key=lambda x: x.get(value_field, 0), reverse=True)
                     top_readings = sorted_readings[:min(10, len(sorted_readings))]  # Limit to 10 for readability
                     
-                    return json.dumps({
+                    return dumps_result({
                         "analysis": "highest",
                         "reading_type": reading_type,
                         "patient_id": result["patient_id"],
@@ -166,7 +167,7 @@ class SpecificMedicalValueTool(BaseTool):
                         "total_readings_found": len(readings),
                         "showing_top": len(top_readings),
                         "message": f"Showing top {len(top_readings)} highest {reading_type} readings out of {len(readings)} total"
-                    }, indent=2)
+                    })
                 
                 elif analysis_type == "lowest":
                     value_field = "systolic" if reading_type == "blood_pressure" else "value"
@@ -177,7 +178,7 @@ class SpecificMedicalValueTool(BaseTool):
                     sorted_readings = sorted(readings, key=lambda x: x.get(value_field, float('inf')))
                     bottom_readings = sorted_readings[:min(10, len(sorted_readings))]  # Limit to 10 for readability
                     
-                    return json.dumps({
+                    return dumps_result({
                         "analysis": "lowest",
                         "reading_type": reading_type,
                         "patient_id": result["patient_id"],
@@ -186,7 +187,7 @@ class SpecificMedicalValueTool(BaseTool):
                         "total_readings_found": len(readings),
                         "showing_bottom": len(bottom_readings),
                         "message": f"Showing bottom {len(bottom_readings)} lowest {reading_type} readings out of {len(readings)} total"
-                    }, indent=2)
+                    })
                 
                 elif analysis_type == "specific" and specific_datetime:
                     # Find the closest reading to specific time
@@ -194,24 +195,32 @@ class SpecificMedicalValueTool(BaseTool):
                         closest = min(readings, key=lambda x: abs(
                             datetime.fromisoformat(x.get("timestamp", x.get("date", ""))) - specific_datetime
                         ))
-                        return json.dumps({
+                        return dumps_result({
                             "analysis": "specific_time",
                             "reading_type": reading_type,
                             "patient_id": result["patient_id"],
                             "closest_reading": closest,
                             "requested_time": specific_time
-                        }, indent=2)
+                        })
                 
                 # Default: return latest reading only to save tokens
                 latest_reading = readings[0] if readings else None
-                return json.dumps({
+                return dumps_result({
                     "reading_type": reading_type,
                     "patient_id": result["patient_id"],
                     "latest_reading": latest_reading,
                     "total_readings_found": len(readings),
                     "message": f"Showing latest {reading_type} reading. Total {len(readings)} readings found."
-                }, indent=2)
+                })
                 
         except Exception as e:
             logger.error(f"Error in SpecificMedicalValueTool: {e}")
             return f"Error getting specific medical values: {str(e)}"
+    
+    async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
+                    reading_type: str = "glucose", specific_time: Optional[str] = None,
+                    date_filter: Optional[str] = None, time_range: Optional[str] = None,
+                    analysis_type: str = "specific") -> str:
+        """Async version of the run method; the sync DB session runs off the event loop"""
+        return await run_blocking(self._run, patient_id, patient_name, reading_type,
+                                  specific_time, date_filter, time_range, analysis_type)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Tool Executor
+Shared thread pool for tool calls that wrap blocking database work
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from dal.database import MYSQL_POOL_SIZE, MYSQL_MAX_OVERFLOW
+
+# Sized to the SQLAlchemy pool (MYSQL_POOL_SIZE + MYSQL_MAX_OVERFLOW) so tool calls
+# the agent gathers in one step all get a connection instead of queueing on
+# pool_timeout, and they never compete with other users of the default executor.
+TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MYSQL_POOL_SIZE + MYSQL_MAX_OVERFLOW, thread_name_prefix="medical-tool"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a sync tool body on the tool pool, carrying over the caller's context vars."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(TOOL_EXECUTOR, functools.partial(ctx.run, func, *args, **kwargs))
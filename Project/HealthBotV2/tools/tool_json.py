@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Tool JSON
+Compact serialization for tool observations returned to the agent
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_result(obj: Any) -> str:
+    """
+    Serialize a tool result without indentation: less work per call and fewer
+    prompt tokens when the observation is fed back to the model. Values the
+    encoder does not know (Decimal, date) fall back to str().
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
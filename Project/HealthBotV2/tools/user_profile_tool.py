@@ -5,10 +5,11 @@ Combines user profile data with plan information
 """
 
 import logging
-import json
 from typing import Optional, Dict, Any
 from datetime import datetime, date
 from langchain.tools import BaseTool
+from tools.tool_executor import run_blocking
+from tools.tool_json import dumps_result
 from dal.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
@@ -92,13 +93,13 @@ class UserProfileTool(BaseTool):
                         ]
                         
                         if not matching_users:
-                            return json.dumps({
+                            return dumps_result({
                                 "error": f"No patient found with name containing '{patient_name}'",
                                 "suggestion": "Try using exact patient name or patient ID"
-                            }, indent=2)
+                            })
                         
                         if len(matching_users) > 1:
-                            return json.dumps({
+                            return dumps_result({
                                 "error": f"Multiple patients found with name containing '{patient_name}'",
                                 "matching_patients": [
                                     {
@@ -108,22 +109,22 @@ class UserProfileTool(BaseTool):
                                     } for u in matching_users
                                 ],
                                 "suggestion": "Please specify exact patient ID or more specific name"
-                            }, indent=2)
+                            })
                         
                         patient_id = matching_users[0].id
                 
                 if not patient_id:
-                    return json.dumps({
+                    return dumps_result({
                         "error": "patient_id or patient_name is required for staff queries"
-                    }, indent=2)
+                    })
             
             with DatabaseManager() as db_manager:
                 # Get user details
                 user_data = db_manager.get_users(user_id=patient_id)
                 if not user_data:
-                    return json.dumps({
+                    return dumps_result({
                         "error": f"User with ID {patient_id} not found"
-                    }, indent=2)
+                    })
                 
                 user = user_data[0]
                 
@@ -160,28 +161,23 @@ class UserProfileTool(BaseTool):
                 # Add plan information if requested
                 if include_plans:
                     if active_plans_only:
-                        # Get current active plan
+                        # Current active plan
                         active_plan = db_manager.get_current_active_plan(patient_id=patient_id)
                         if active_plan:
                             profile["active_plan"] = active_plan
                         else:
                             profile["active_plan"] = None
                             profile["plan_message"] = "No active plan found"
-                        
-                        # Get plan usage summary
-                        usage_summary = db_manager.get_plan_usage_summary(patient_id=patient_id)
-                        if usage_summary:
-                            profile["plan_usage"] = usage_summary
                     else:
-                        # Get all plans
+                        # All plans
                         all_plans = db_manager.get_user_plans(patient_id=patient_id)
                         profile["all_plans"] = all_plans
                         profile["total_plans"] = len(all_plans)
-                        
-                        # Still get usage summary for current plan
-                        usage_summary = db_manager.get_plan_usage_summary(patient_id=patient_id)
-                        if usage_summary:
-                            profile["plan_usage"] = usage_summary
+                    
+                    # Usage summary for the current plan
+                    usage_summary = db_manager.get_plan_usage_summary(patient_id=patient_id)
+                    if usage_summary:
+                        profile["plan_usage"] = usage_summary
                 
                 # Add summary message
                 plan_info = ""
@@ -192,16 +188,16 @@ class UserProfileTool(BaseTool):
                 
                 profile["summary"] = f"Profile for {profile['personal_info']['full_name']} (ID: {patient_id}){plan_info}"
                 
-                return json.dumps(profile, indent=2, default=str)
+                return dumps_result(profile)
         
         except Exception as e:
             logger.error(f"Error in UserProfileTool: {e}")
-            return json.dumps({
+            return dumps_result({
                 "error": f"Database error: {str(e)}",
                 "patient_id": patient_id
-            }, indent=2)
+            })
     
     async def _arun(self, patient_id: Optional[int] = None, patient_name: Optional[str] = None,
                     include_plans: bool = True, active_plans_only: bool = True) -> str:
         """Async version of the run method"""
-        return self._run(patient_id, patient_name, include_plans, active_plans_only)
+        return await run_blocking(self._run, patient_id, patient_name, include_plans, active_plans_only)